@@ -25,6 +25,10 @@ APP_VERSION = '0.1'
 FILE_EXT = "ftw"
 COPYRIGHT = 'Copyright Jonny Jones and Ieuan Jones 2009'
 AUTHORS = ['Jonny Jones','Ieuan Jones']
+#Milliseconds to wait for typing or spinning to stop before regenerating and redrawing
+SETTLE_DELAY = 300
+#Milliseconds between checks on a puzzle being generated in the background
+GENERATION_POLL_DELAY = 100
 
 import sys
 try:
@@ -46,7 +50,9 @@ try:
     import pangocairo
     import gobject
     import os
-    import cPickle
+    from ftw import fileformat
+    from ftw.bank import PuzzleBank, BANK_EXT
+    from ftw.worker import GenerationWorker, POPULATE, RESIZE, REBUILD
     from ftw.puzzle import *
 except ImportError, error_message:
     error_dialog = gtk.MessageDialog(None
@@ -80,6 +86,19 @@ class FindThatWord():
         self.show_grid = True
         self.show_words = True
         self.show_solution = True
+        #The rendered preview is kept offscreen and only redrawn when it changes
+        self.preview_surface = None
+        self.preview_key = None
+        self.preview_revision = 0
+        #Changes waiting for input to settle, and the timeout that will apply them
+        self.pending_changes = set()
+        self.pending_source = None
+        #Slow puzzle generation runs in another process
+        self.generation_worker = None
+        self.generation_dialog = None
+        #False if the last background generation was cancelled
+        self.generation_completed = True
+        self.generation_source = None
         
         #Initialise the Glade GUI environment
         self.widget_tree = gtk.glade.XML(self.gladefile, "MainWindow")
@@ -216,6 +235,7 @@ class FindThatWord():
         self.update_ascending_button()
         self.on_WordsListWidgetSelection_changed(None)
         self.update_words_list()
+        self.invalidate_preview()
         results_area_widget.queue_draw()
         
     def update_window_title(self):
@@ -277,7 +297,120 @@ class FindThatWord():
             
     def update_results_widget(self):
         """Redraw the puzzle output"""          
+        self.invalidate_preview()
         self.draw_as_widget()
+
+    def schedule_update(self, change):
+        """Record a change to apply once input has settled.  change is "redraw", "padding"
+        or "resize".  Each new change restarts the wait"""
+        self.pending_changes.add(change)
+        if self.pending_source is not None:
+            gobject.source_remove(self.pending_source)
+        self.pending_source = gobject.timeout_add(SETTLE_DELAY, self.apply_pending_changes)
+
+    def apply_pending_changes(self):
+        """Apply the changes recorded by schedule_update, with one regeneration and
+        one redraw at most.  Returns False so that the timeout isn't repeated"""
+        if self.generation_worker is not None:
+            #Wait until the puzzle has been generated
+            return True
+        if self.pending_source is not None:
+            gobject.source_remove(self.pending_source)
+            self.pending_source = None
+        changes = self.pending_changes
+        self.pending_changes = set()
+        if "padding" in changes:
+            self.puzzle.grid.add_padding()
+        if changes:
+            self.update_results_widget()
+        if "resize" in changes:
+            self.start_generation(RESIZE)
+        return False
+
+    def settle_changes(self):
+        """Apply any pending changes now and wait for the regeneration they start, so that
+        the puzzle is complete before it's saved, exported or printed.  Returns False if
+        the regeneration was cancelled"""
+        self.generation_completed = True
+        while self.generation_completed:
+            if self.generation_worker is not None:
+                gtk.main_iteration()
+            elif self.pending_changes:
+                self.apply_pending_changes()
+            else:
+                break
+        return self.generation_completed
+
+    """
+    ***********************************************************
+    *                                                         *
+    * Background generation                                   *
+    *                                                         *
+    ***********************************************************
+    """
+    def start_generation(self, operation):
+        """Run a puzzle operation from ftw.worker in another process, showing its progress
+        and allowing it to be cancelled.  The result is copied into the puzzle when it's
+        finished.  The dialog is modal, so the puzzle can't be changed in the meantime"""
+        if operation == RESIZE and tuple(self.puzzle.grid.get_grid_size()) == self.puzzle.get_wanted_size():
+            #Nothing to do
+            return
+        self.generation_worker = GenerationWorker(self.puzzle, operation)
+        self.generation_worker.start()
+        self.generation_dialog = gtk.Dialog("Generating Puzzle", self.main_window,
+                                            gtk.DIALOG_MODAL | gtk.DIALOG_DESTROY_WITH_PARENT,
+                                            (gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL))
+        self.generation_label = gtk.Label("Placing the words...")
+        self.generation_progress_bar = gtk.ProgressBar()
+        self.generation_dialog.vbox.pack_start(self.generation_label)
+        self.generation_dialog.vbox.pack_start(self.generation_progress_bar)
+        self.generation_dialog.connect("response", self.on_GenerationDialog_response)
+        self.generation_dialog.show_all()
+        self.generation_source = gobject.timeout_add(GENERATION_POLL_DELAY, self.poll_generation)
+
+    def poll_generation(self):
+        """Show the progress of the background generation.  Returns False once it's
+        finished, to stop the timeout"""
+        worker = self.generation_worker
+        if worker is None:
+            return False
+        if worker.poll():
+            self.generation_source = None
+            self.finish_generation(True)
+            return False
+        self.generation_label.set_text("Trying a %dx%d grid, attempt %d" % (worker.grid_size + (worker.attempt,)))
+        self.generation_progress_bar.pulse()
+        return True
+
+    def finish_generation(self, completed):
+        """Close the progress dialog and, if completed, copy the result into the puzzle"""
+        worker = self.generation_worker
+        self.generation_worker = None
+        if self.generation_source is not None:
+            gobject.source_remove(self.generation_source)
+            self.generation_source = None
+        self.generation_dialog.destroy()
+        self.generation_dialog = None
+        self.generation_completed = completed
+        if completed:
+            if not worker.apply():
+                self.display_failure()
+        else:
+            worker.cancel()
+            #Words changed before the generation started may still be drawn in the grid, and
+            #a word waiting to be placed mustn't be drawn anywhere
+            self.puzzle.redraw_fitting_words()
+        self.update_results_widget()
+        self.set_dirty(True)
+
+    def on_GenerationDialog_response(self, widget, response):
+        """Cancel the background generation"""
+        if self.generation_worker is not None:
+            self.finish_generation(False)
+
+    def invalidate_preview(self):
+        """Note that the puzzle has changed, so the preview must be rendered again"""
+        self.preview_revision += 1
        
     def update_hidden_message_widget(self):
         """Enable / disable the hidden message widget"""
@@ -318,6 +451,8 @@ class FindThatWord():
         paper_width = self.page_setup.get_page_width(gtk.UNIT_MM)
         ratio = paper_width / paper_height
         self.widget_tree.get_widget("ResultsAreaAspectFrame").set(0.5, 0.5, ratio, False)
+        #The margins may have changed even if the size hasn't
+        self.invalidate_preview()
             
     def display_failure(self):
         """Display warning that puzzle could not be completed"""
@@ -326,7 +461,10 @@ class FindThatWord():
                           , gtk.MESSAGE_WARNING
                           , gtk.BUTTONS_CLOSE,
                           "Error creating puzzle")
-        msg_dialog.format_secondary_text("It was not possible to fit all the words in the puzzle grid.  Try a larger grid size.")
+        if self.puzzle.proven_unsolvable:
+            msg_dialog.format_secondary_text("The words cannot fit in a grid of this size.  Try a larger grid size.")
+        else:
+            msg_dialog.format_secondary_text("It was not possible to fit all the words in the puzzle grid.  Try a larger grid size.")
         response = msg_dialog.run()
         msg_dialog.destroy()
         return response == gtk.RESPONSE_YES
@@ -425,8 +563,10 @@ class FindThatWord():
             
     def save_file(self):
         """Save the file.  The filename must already have been set"""
+        if not self.settle_changes():
+            return
         try:
-            file = cPickle.dumps(self.puzzle, cPickle.HIGHEST_PROTOCOL)
+            file = fileformat.dumps(self.puzzle)
             if self.uri and RECENT_CHOOSER:
                 #We know the file by its URI
                 handler = gnomevfs.Handle(self.uri, gnomevfs.OPEN_WRITE)
@@ -457,6 +597,8 @@ class FindThatWord():
             
     def export_file(self):
         """Open a Export dialogue and export the file in the format specified by the user"""
+        if not self.settle_changes():
+            return
         #Initialise the dialog
         buttons = (gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL,
                    gtk.STOCK_SAVE, gtk.RESPONSE_OK)
@@ -511,7 +653,7 @@ class FindThatWord():
                 handler = gnomevfs.Handle( filename )
                 file_size = handler.get_file_info().size
                 new_file = handler.read(file_size)
-                self.puzzle = cPickle.loads(new_file)
+                self.puzzle = fileformat.loads(new_file)
                 handler.close()
                 #make a crude guess at a sensible filename from the URI
                 uri = filename
@@ -519,10 +661,9 @@ class FindThatWord():
                 self.set_filename(filename, uri, False)
             else:
                 file = open(filename, 'rb')
-                self.puzzle = cPickle.load(file)
+                self.puzzle = fileformat.loads(file.read())
                 self.set_filename(filename, None, False)
                 file.close()
-            self.puzzle.grid.puzzle = self.puzzle
             #Update the display
             self.update_all_widgets()
             self.set_dirty(False)
@@ -539,6 +680,59 @@ class FindThatWord():
             error_dialog.destroy()
             return False
 
+    def load_from_bank(self, filename):
+        """Asks which puzzle to open from a puzzle bank and opens it as a new, unsaved puzzle.
+        Returns True if successful"""
+        try:
+            bank = PuzzleBank(filename)
+        except:
+            bank = None
+        if not bank or not len(bank):
+            error_dialog = gtk.MessageDialog(self.main_window
+                              , gtk.DIALOG_MODAL | gtk.DIALOG_DESTROY_WITH_PARENT
+                              , gtk.MESSAGE_ERROR
+                              , gtk.BUTTONS_CLOSE,
+                              "Unable to open puzzle bank" )
+            error_dialog.format_secondary_text(filename)
+            error_dialog.run()
+            error_dialog.destroy()
+            return False
+        number = self.choose_bank_puzzle(bank)
+        if number is not None:
+            self.set_dirty("clean")
+            self.puzzle = bank.get_puzzle(number)
+            self.filename = None
+            self.uri = None
+            self.update_all_widgets()
+            self.set_dirty(True)
+        bank.close()
+        return number is not None
+
+    def choose_bank_puzzle(self, bank):
+        """Ask which puzzle to open from a puzzle bank.  Returns the puzzle's index, or
+        None if the user cancelled"""
+        buttons = (gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL, gtk.STOCK_OPEN, gtk.RESPONSE_OK)
+        dialog = gtk.Dialog("Open Puzzle From Bank", self.main_window,
+                            gtk.DIALOG_MODAL | gtk.DIALOG_DESTROY_WITH_PARENT, buttons)
+        dialog.vbox.pack_start(gtk.Label("Puzzle number (1 to %d):" % len(bank)))
+        spin = gtk.SpinButton(gtk.Adjustment(1, 1, len(bank), 1, 10))
+        dialog.vbox.pack_start(spin)
+        title_label = gtk.Label()
+        dialog.vbox.pack_start(title_label)
+        def show_title(spin):
+            #Only the chosen puzzle's title is decoded
+            record = bank.get_record(spin.get_value_as_int() - 1)
+            title_label.set_text("%s (%dx%d)" % ((record.get_title(),) + record.get_grid_size()))
+        spin.connect("value-changed", show_title)
+        show_title(spin)
+        dialog.show_all()
+        response = dialog.run()
+        number = spin.get_value_as_int() - 1
+        dialog.destroy()
+        if response == gtk.RESPONSE_OK:
+            return number
+        return None
+
     def open_file_with_dialog(self):
         """Open an Open dialogue and opens the selected file"""
         
@@ -552,6 +746,10 @@ class FindThatWord():
         filter.set_name("FindThatWord files")
         filter.add_pattern("*." + FILE_EXT)
         chooser.add_filter(filter)
+        bank_filter = gtk.FileFilter()
+        bank_filter.set_name("FindThatWord puzzle banks")
+        bank_filter.add_pattern("*." + BANK_EXT)
+        chooser.add_filter(bank_filter)
         filter2 = gtk.FileFilter()
         filter2.set_name("All files")
         filter2.add_pattern("*")
@@ -563,7 +761,12 @@ class FindThatWord():
         #Run the dialog
         if chooser.run() == gtk.RESPONSE_OK:
             #Not all platforms can handle URIs...
-            if RECENT_CHOOSER:
+            bank_filename = chooser.get_filename() or chooser.get_uri()
+            if bank_filename.endswith("." + BANK_EXT):
+                #Banks are memory mapped, so need a local file.  A remote one has no filename,
+                #and is reported by load_from_bank() as a bank it can't open
+                self.load_from_bank(bank_filename)
+            elif RECENT_CHOOSER:
                 new_uri = chooser.get_uri()
                 if self.load_file(new_uri, "URI"):
                     self.set_filename( chooser.get_filename(), new_uri, False )
@@ -634,17 +837,39 @@ class FindThatWord():
         
     def draw_as_text(self, filename):
         """Write a text stream containing the puzzle to filname"""
-        result = self.puzzle.draw_as_text(self.show_solution, self.show_title, self.show_grid, self.show_words)
         export_file = open(filename, "w")
-        export_file.write(result)
+        self.puzzle.write_text(export_file, self.show_solution, self.show_title, self.show_grid, self.show_words)
         export_file.close()
 
-    def draw_as_widget(self):
-        """Draw the puzzle onto the ResultsArea screen widget"""
-        #create a cairo context and fill it with a white background
+    def draw_as_widget(self, area = None):
+        """Draw the puzzle onto the ResultsArea screen widget.  The puzzle is rendered to an
+        offscreen surface, which is reused until the puzzle, the display options, the selected
+        word or the widget size change.  area optionally limits drawing to an exposed rectangle"""
         results_area_cairo_widget = self.widget_tree.get_widget("ResultsAreaCairo")
-        result_area = results_area_cairo_widget.window.cairo_create()
+        widget_area = results_area_cairo_widget.window.cairo_create()
+        if area:
+            widget_area.rectangle(area.x, area.y, area.width, area.height)
+            widget_area.clip()
         result_size_x, result_size_y = results_area_cairo_widget.window.get_size()
+        tree_model, iter = self.words_view_widget_selection.get_selected()
+        if iter:
+            selected_row = tree_model.get_string_from_iter(iter)
+        else:
+            selected_row = None
+        key = (self.preview_revision, result_size_x, result_size_y, selected_row,
+               self.show_title, self.show_grid, self.show_words, self.show_solution)
+        if key != self.preview_key:
+            self.preview_surface = widget_area.get_target().create_similar(cairo.CONTENT_COLOR,
+                                                                           result_size_x, result_size_y)
+            self.render_preview(self.preview_surface, result_size_x, result_size_y)
+            self.preview_key = key
+        widget_area.set_source_surface(self.preview_surface, 0, 0)
+        widget_area.paint()
+
+    def render_preview(self, preview_surface, result_size_x, result_size_y):
+        """Draw the puzzle onto the offscreen surface used by draw_as_widget"""
+        #create a cairo context and fill it with a white background
+        result_area = cairo.Context(preview_surface)
         #Set the dimensions to scale to the page dimensions  The widget already has the correct aspect ratio
         paper_height = self.page_setup.get_paper_height(gtk.UNIT_INCH)
         paper_width = self.page_setup.get_paper_width(gtk.UNIT_INCH)
@@ -701,6 +926,8 @@ class FindThatWord():
     
     def show_print_dialogue(self):
         """Display a print dialogue box and print the puzzle"""
+        if not self.settle_changes():
+            return
         
         print_operation = gtk.PrintOperation()
         if self.print_settings != None: 
@@ -805,10 +1032,9 @@ class FindThatWord():
     
     def on_RefreshIcon_clicked(self, widget):
         """Refresh icon clicked"""
-        if not self.puzzle.populate_grid():
-            self.display_failure()
-        self.set_dirty(True)
-        self.update_results_widget()
+        #A new seed gives a new layout
+        self.puzzle.set_seed()
+        self.start_generation(POPULATE)
         
     def on_ExportIcon_clicked(self, widget):
         self.export_file()
@@ -820,7 +1046,7 @@ class FindThatWord():
     def on_PuzzleTitleEntry_changed(self, widget):
         """Change made to puzzle title"""
         self.puzzle.set_title( widget.get_text() )
-        self.update_results_widget()
+        self.schedule_update("redraw")
         self.set_dirty(True)
         
     def on_NarrativeWidget_changed(self, widget):
@@ -828,7 +1054,7 @@ class FindThatWord():
         start = widget.get_start_iter()
         end = widget.get_end_iter()
         self.puzzle.set_narrative( widget.get_text(start, end) )
-        self.update_results_widget()
+        self.schedule_update("redraw")
         self.set_dirty(True)
         
     def on_WordsListWidgetSelection_changed(self, widget):
@@ -886,11 +1112,11 @@ class FindThatWord():
         if self.edit_mode and self.puzzle.get_word(selected_row) == self.edited_word:
             #Deal with deleting the word that's currently being edited, 
             self.set_edit_mode(False)
-        self.puzzle.delete_word(selected_row)
+        self.puzzle.delete_word(selected_row, False)
         tree_model.remove(iter)
-        self.update_results_widget()
         self.update_ascending_button()
         self.set_dirty(True)
+        self.start_generation(REBUILD)
         
     def on_MoveUpButton_clicked(self, widget):
         """Move a word up in the puzzle"""
@@ -934,23 +1160,23 @@ class FindThatWord():
         #Get the data from the GUI
         new_word = self.new_word_entry_widget.get_text()
         description = self.new_description_entry_widget.get_text()
-        #Add it to the puzzle
-        if not self.puzzle.add_word(new_word, description):
-            self.display_failure()
+        #Add it to the puzzle.  If the grid has to be regenerated, that's done in the background
+        placed = self.puzzle.add_word(new_word, description, False)
         self.new_word_entry_widget.set_text("")
         self.new_description_entry_widget.set_text("")
         self.update_words_list()
         self.update_results_widget()
         self.update_ascending_button()
         self.set_dirty(True)
+        if placed is None:
+            self.start_generation(REBUILD)
         
     def on_ApplyButton_clicked(self, widget):
         """Update the word being edited"""
         #Get the data from the GUI
         new_word = self.new_word_entry_widget.get_text()
         description = self.new_description_entry_widget.get_text()
-        if not self.edited_word.update(new_word, description):
-            self.display_failure()
+        placed = self.edited_word.update(new_word, description, False)
         #Clear out evidence of the editing process
         self.set_edit_mode(False)
         self.new_word_entry_widget.set_text("")
@@ -959,6 +1185,8 @@ class FindThatWord():
         self.update_words_list()
         self.update_results_widget()
         self.set_dirty(True)
+        if placed is None:
+            self.start_generation(REBUILD)
     
     def on_CancelButton_clicked(self, widget):
         """Cancel editing the word"""
@@ -976,8 +1204,7 @@ class FindThatWord():
     def on_HiddenMessageEntry_changed(self, widget):
         """Update the hidden message"""
         self.puzzle.grid.padding = self.widget_tree.get_widget("HiddenMessageEntry").get_text()
-        self.puzzle.grid.add_padding()
-        self.update_results_widget()
+        self.schedule_update("padding")
         self.set_dirty(True)
                     
     def on_ForceSizeCheckButton_toggled(self, widget):
@@ -986,10 +1213,8 @@ class FindThatWord():
         self.widget_tree.get_widget("xSpin").set_text(str(self.puzzle.force_x))
         self.widget_tree.get_widget("ySpin").set_text(str(self.puzzle.force_y))
         self.update_grid_size_widget()
-        if not self.puzzle.resize_grid():
-            self.display_failure()
-        self.update_results_widget()
         self.set_dirty(True)
+        self.start_generation(RESIZE)
     
     def on_ShowTitleCheckButton_toggled(self, widget):
         """Toggle the show entire solution option and print if its working"""
@@ -1017,9 +1242,7 @@ class FindThatWord():
             self.puzzle.force_x = widget.get_value_as_int()
         except:
             self.puzzle.force_x = 2
-        if not self.puzzle.resize_grid():
-            self.display_failure()
-        self.update_results_widget()
+        self.schedule_update("resize")
         self.set_dirty(True)
 
     def on_ySpin_output(self, widget):
@@ -1028,14 +1251,12 @@ class FindThatWord():
             self.puzzle.force_y = widget.get_value_as_int()
         except:
             self.puzzle.force_y = 2
-        if not self.puzzle.resize_grid():
-            self.display_failure()
-        self.update_results_widget()
+        self.schedule_update("resize")
         self.set_dirty(True)
         
     def on_ResultsArea_expose_event(self, widget, signal):
-        """Draw the puzzle"""
-        self.update_results_widget()
+        """Draw the puzzle.  Only the exposed area is copied from the cached preview"""
+        self.draw_as_widget(signal.area)
         
 """
 ***********************************************************
@@ -0,0 +1,188 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+Layout of a puzzle bank.  All numbers are little-endian.
+
+    header      BANK_HEADER: magic, version, the offset of the index and the number
+                of puzzles in it.  The index offset is 0 while the bank is being written
+    puzzles     one record from ftw.fileformat after another
+    index       an INDEX_ENTRY for each puzzle giving the offset of its record
+
+Puzzles are only ever appended: the index is dropped while new records are written
+after the old ones, then written again after the last record.  A bank left without
+an index can still be read, as each record gives its own length.
+"""
+
+import mmap
+import os
+import struct
+
+from ftw import fileformat
+
+MAGIC = "FTWB"
+VERSION = 1
+BANK_EXT = "ftwb"
+
+BANK_HEADER = struct.Struct('<4sHxxQQ')
+INDEX_ENTRY = struct.Struct('<Q')
+
+
+class BankError(Exception):
+    """Raised when a file isn't a puzzle bank that this version can read"""
+
+
+def is_bank_file(filename):
+    """Returns True if filename is a puzzle bank"""
+    bank_file = open(filename, 'rb')
+    magic = bank_file.read(len(MAGIC))
+    bank_file.close()
+    return magic == MAGIC
+
+
+def read_header(data):
+    """Returns the index offset and puzzle count from the header at the start of data"""
+    if len(data) < BANK_HEADER.size:
+        raise BankError("not a FindThatWord puzzle bank")
+    magic, version, index_offset, count = BANK_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise BankError("not a FindThatWord puzzle bank")
+    if version > VERSION:
+        raise BankError("puzzle bank saved by a newer version of FindThatWord")
+    return index_offset, count
+
+
+def scan_records(data, end):
+    """Returns the offsets of the complete records found one after another from the end
+    of the header up to end, and the offset just after the last of them.  The scan stops
+    at anything that isn't a whole record, such as one cut short when writing stopped"""
+    offsets = []
+    offset = BANK_HEADER.size
+    while offset + fileformat.HEADER.size <= end and fileformat.is_puzzle_data(data, offset):
+        length = fileformat.PuzzleRecord(data, offset).length
+        if length < fileformat.HEADER.size or offset + length > end:
+            break
+        offsets.append(offset)
+        offset += length
+    return offsets, offset
+
+
+class PuzzleBankWriter(object):
+    """Appends puzzles to a bank, creating it if it doesn't exist.  close() must be
+    called to write the index"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        if os.path.exists(filename):
+            self.bank_file = open(filename, 'r+b')
+            index_offset, count = read_header(self.bank_file.read(BANK_HEADER.size))
+            if index_offset:
+                self.bank_file.seek(index_offset)
+                index = self.bank_file.read(count * INDEX_ENTRY.size)
+                self.offsets = [INDEX_ENTRY.unpack_from(index, i * INDEX_ENTRY.size)[0]
+                                for i in range(0, count)]
+                end = index_offset
+            else:
+                #Anything after the last complete record is dropped
+                self.bank_file.seek(0)
+                data = self.bank_file.read()
+                self.offsets, end = scan_records(data, len(data))
+            #The old index is overwritten by the new records
+            self.bank_file.seek(end)
+            self.bank_file.truncate()
+        else:
+            self.bank_file = open(filename, 'w+b')
+            self.offsets = []
+        self.write_header(0)
+        self.bank_file.seek(0, os.SEEK_END)
+
+    def write_header(self, index_offset):
+        self.bank_file.seek(0)
+        self.bank_file.write(BANK_HEADER.pack(MAGIC, VERSION, index_offset, len(self.offsets)))
+
+    def append(self, puzzle):
+        """Add a puzzle to the end of the bank.  Returns its number"""
+        return self.append_data(fileformat.dumps(puzzle))
+
+    def append_data(self, data):
+        """Add a puzzle already encoded by ftw.fileformat.dumps().  Returns its number"""
+        self.offsets.append(self.bank_file.tell())
+        self.bank_file.write(data)
+        return len(self.offsets) - 1
+
+    def close(self):
+        """Write the index and close the bank"""
+        index_offset = self.bank_file.tell()
+        self.bank_file.write(''.join([INDEX_ENTRY.pack(offset) for offset in self.offsets]))
+        self.write_header(index_offset)
+        self.bank_file.close()
+
+
+class PuzzleBank(object):
+    """Read-only access to the puzzles in a bank.  The file is memory mapped, so
+    opening a bank or looking up puzzle N reads nothing but the header and one index
+    entry.  Puzzles are returned as fileformat.PuzzleRecord objects, which decode
+    their contents when asked"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        bank_file = open(filename, 'rb')
+        try:
+            self.data = mmap.mmap(bank_file.fileno(), 0, access = mmap.ACCESS_READ)
+        finally:
+            bank_file.close()
+        self.index_offset, self.count = read_header(self.data)
+        if self.index_offset:
+            self.offsets = None
+        else:
+            #The bank wasn't closed properly, so find the records the slow way
+            self.offsets = scan_records(self.data, len(self.data))[0]
+            self.count = len(self.offsets)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, number):
+        return self.get_record(number)
+
+    def __iter__(self):
+        for number in xrange(0, self.count):
+            yield self.get_record(number)
+
+    def get_offset(self, number):
+        """Returns the offset of the record for puzzle number"""
+        if number < 0:
+            number += self.count
+        if not 0 <= number < self.count:
+            raise IndexError("puzzle number out of range")
+        if self.offsets is not None:
+            return self.offsets[number]
+        return INDEX_ENTRY.unpack_from(self.data, self.index_offset + number * INDEX_ENTRY.size)[0]
+
+    def get_record(self, number):
+        """Returns puzzle number as a PuzzleRecord"""
+        return fileformat.PuzzleRecord(self.data, self.get_offset(number))
+
+    def get_puzzle(self, number):
+        """Returns puzzle number as a Puzzle"""
+        return self.get_record(number).get_puzzle()
+
+    def close(self):
+        self.data.close()
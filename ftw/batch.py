@@ -0,0 +1,322 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import itertools
+import multiprocessing
+import optparse
+import os
+import sys
+import time
+
+from ftw import fileformat
+from ftw.bank import PuzzleBank, PuzzleBankWriter, is_bank_file
+from ftw.cache import DEFAULT_MAX_ENTRIES, GenerationCache
+from ftw.export import FORMATS, TEXT_SEPARATOR, warm_up, write_formats
+from ftw.parallel import KEEP_CHOICES, KEEP_FIRST, MultiStart
+from ftw.puzzle import Puzzle
+from ftw.wordlists import find_wordlists, read_wordlist
+
+USAGE = """%prog [options] WORDLIST...
+
+Generate wordsearch puzzles without the GUI.  Each WORDLIST is a text file
+with one word per line, optionally followed by a tab and a clue, or a
+directory containing such files.  Blank lines and lines starting with # are
+ignored.  Puzzles are named after their wordlist file.
+
+A WORDLIST can also be a FindThatWord file or a puzzle bank, in which case the
+puzzles already in it are exported without being generated again."""
+
+
+def find_sources(paths):
+    """Returns the wordlist files named by paths, with each puzzle bank replaced by a
+    (bank filename, puzzle number) pair for every puzzle in it"""
+    sources = []
+    for filename in find_wordlists(paths):
+        if is_bank_file(filename):
+            bank = PuzzleBank(filename)
+            sources.extend([(filename, number) for number in range(0, len(bank))])
+            bank.close()
+        else:
+            sources.append(filename)
+    return sources
+
+
+#Each worker process keeps its own generation cache, created on first use
+_cache = None
+#and its own view of each puzzle bank it reads from
+_banks = {}
+
+
+def get_cache(options):
+    """Returns the generation cache for this process, or None if caching is off"""
+    global _cache
+    if _cache is None and (options.cache_dir or options.cache_size):
+        _cache = GenerationCache(options.cache_size or DEFAULT_MAX_ENTRIES, options.cache_dir)
+    return _cache
+
+
+def get_bank(filename):
+    """Returns the puzzle bank for this process"""
+    if filename not in _banks:
+        _banks[filename] = PuzzleBank(filename)
+    return _banks[filename]
+
+
+def build_puzzle(title, wordlist, force_size = None, use_solver = False, hidden_message = None, seed = None,
+                 cache = None, time_budget = None, max_attempts = None, parallel_starts = None, keep = KEEP_FIRST):
+    """Returns a new puzzle containing the (word, clue) pairs in wordlist, and the
+    GenerationResult from placing the words in the grid.  force_size is an optional
+    (x, y) pair.  A random seed is chosen if seed is None.  time_budget and max_attempts
+    optionally limit the time and attempts spent placing the words.  If parallel_starts
+    is more than 1, that many differently seeded attempts run at once in a pool of
+    processes, keeping the grid chosen by keep, and the generation cache isn't used"""
+    puzzle = Puzzle()
+    puzzle.set_seed(seed)
+    puzzle.cache = cache
+    puzzle.time_budget = time_budget
+    puzzle.max_attempts = max_attempts
+    puzzle.set_title(title)
+    puzzle.use_solver = use_solver
+    if hidden_message:
+        puzzle.grid.padding = hidden_message
+        puzzle.grid.random_padding = False
+    if force_size:
+        puzzle.set_is_forced_size(True)
+        puzzle.force_x, puzzle.force_y = force_size
+    if parallel_starts > 1:
+        puzzle.add_words(wordlist, False)
+        placed = MultiStart(puzzle, parallel_starts, time_budget = time_budget, keep = keep).populate_grid()
+    else:
+        placed = puzzle.add_words(wordlist)
+    return puzzle, placed
+
+
+def generate(job):
+    """Build and export the puzzle for one wordlist file, or export one puzzle from a
+    bank.  This runs in a worker process, so all errors are caught and reported in the
+    result"""
+    source, options = job
+    if isinstance(source, tuple):
+        bank_filename, number = source
+        name = "%s-%05d" % (os.path.splitext(os.path.basename(bank_filename))[0], number)
+        filename = "%s:%d" % source
+    else:
+        filename = source
+        name = os.path.splitext(os.path.basename(filename))[0]
+    result = {'name': name, 'filename': filename, 'placed': False, 'status': None,
+              'grid_size': None, 'seed': None, 'seconds': 0.0, 'error': None,
+              'cache_hits': 0, 'cache_misses': 0, 'timings': {}}
+    start_time = time.time()
+    cache = get_cache(options)
+    if cache:
+        hits, misses = cache.hits, cache.misses
+    try:
+        if isinstance(source, tuple):
+            puzzle = get_bank(bank_filename).get_puzzle(number)
+            placed = puzzle.get_result()
+        elif filename.endswith('.ftw'):
+            puzzle = fileformat.load(filename)
+            placed = puzzle.get_result()
+        else:
+            puzzle, placed = build_puzzle(name, read_wordlist(filename), options.force_size,
+                                          options.use_solver, options.hidden_message, options.seed, cache,
+                                          options.time_budget, options.max_attempts, options.parallel_starts,
+                                          options.keep)
+        result['placed'] = bool(placed)
+        result['status'] = placed.status
+        result['seed'] = puzzle.get_seed()
+        result['grid_size'] = tuple(puzzle.grid.get_grid_size())
+        if placed:
+            write_formats(puzzle, os.path.join(options.output_dir, name), options.formats,
+                          options.show_solution, result['timings'])
+            if options.bank or options.text_file:
+                #Only the main process writes to the bank and the text file
+                result['puzzle_data'] = fileformat.dumps(puzzle)
+        elif placed.out_of_budget:
+            result['error'] = "gave up after %d attempts with %d of %d words placed" % (
+                                    placed.attempts, placed.placed_words, placed.word_count)
+        else:
+            result['error'] = "could not fit all the words in the grid"
+    except Exception, error:
+        result['error'] = "%s: %s" % (error.__class__.__name__, error)
+    result['seconds'] = time.time() - start_time
+    if cache:
+        result['cache_hits'] = cache.hits - hits
+        result['cache_misses'] = cache.misses - misses
+    return result
+
+
+def format_result(result):
+    """Returns a one line description of a result from generate()"""
+    if result['placed'] and not result['error']:
+        status = "ok"
+    else:
+        status = "FAILED"
+    if result['grid_size']:
+        grid_size = "%dx%d" % result['grid_size']
+    else:
+        grid_size = "-"
+    line = "%-6s %-30s %7s %8.3fs" % (status, result['name'], grid_size, result['seconds'])
+    if result['error']:
+        line += "  " + result['error']
+    return line
+
+
+def write_summary(results, elapsed, summary_file):
+    """Print the totals for a batch run, and optionally write one tab separated line
+    per puzzle to summary_file"""
+    succeeded = [result for result in results if result['placed'] and not result['error']]
+    timings = [result['seconds'] for result in results]
+    print
+    print "%d puzzles: %d succeeded, %d failed" % (len(results), len(succeeded), len(results) - len(succeeded))
+    if results:
+        print "Elapsed %.2fs, %.1f puzzles/s.  Per puzzle: mean %.3fs, max %.3fs" % (
+                        elapsed, len(results) / max(elapsed, 0.001),
+                        sum(timings) / len(timings), max(timings))
+        cache_hits = sum([result['cache_hits'] for result in results])
+        cache_misses = sum([result['cache_misses'] for result in results])
+        if cache_hits or cache_misses:
+            print "Generation cache: %d hits, %d misses" % (cache_hits, cache_misses)
+        format_seconds = {}
+        for result in results:
+            for file_format, seconds in result['timings'].items():
+                format_seconds[file_format] = format_seconds.get(file_format, 0.0) + seconds
+        for file_format in sorted(format_seconds):
+            print "Export %-4s %8.3fs total, %.4fs per puzzle" % (file_format, format_seconds[file_format],
+                                                                  format_seconds[file_format] / len(results))
+    if summary_file:
+        output = open(summary_file, 'w')
+        output.write("name\tfilename\tplaced\tgrid_size\tseed\tseconds\terror\tstatus\n")
+        for result in results:
+            if result['grid_size']:
+                grid_size = "%dx%d" % result['grid_size']
+            else:
+                grid_size = ""
+            output.write("%s\t%s\t%s\t%s\t%s\t%.4f\t%s\t%s\n" % (result['name'], result['filename'],
+                                                                 result['placed'], grid_size, result['seed'],
+                                                                 result['seconds'], result['error'] or "",
+                                                                 result['status'] or ""))
+        output.close()
+
+
+def parse_size(option, opt_str, value, parser):
+    """optparse callback that converts WxH into an (x, y) pair"""
+    try:
+        x, y = [int(dimension) for dimension in value.lower().split('x')]
+    except ValueError:
+        raise optparse.OptionValueError("%s expects a size such as 15x15" % opt_str)
+    setattr(parser.values, option.dest, (x, y))
+
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage = USAGE)
+    parser.add_option("-o", "--output-dir", default = ".",
+                      help = "directory for the generated files [default: %default]")
+    parser.add_option("-f", "--formats", default = "ftw,txt",
+                      help = "comma separated output formats from " + ", ".join(FORMATS) + " [default: %default]")
+    parser.add_option("-j", "--processes", type = "int", default = multiprocessing.cpu_count(),
+                      help = "number of worker processes [default: %default]")
+    parser.add_option("-s", "--size", dest = "force_size", type = "string", action = "callback",
+                      callback = parse_size, help = "force the grid size, e.g. 15x15")
+    parser.add_option("--solver", dest = "use_solver", action = "store_true", default = False,
+                      help = "place words with the backtracking solver")
+    parser.add_option("--seed", type = "int",
+                      help = "seed for the random generator, so that the same wordlist gives the same puzzle")
+    parser.add_option("--cache-dir",
+                      help = "reuse generated grids stored in this directory, and store new ones there")
+    parser.add_option("--cache-size", type = "int",
+                      help = "number of generated grids each worker keeps in memory")
+    parser.add_option("--time-budget", type = "float",
+                      help = "give up placing the words of a puzzle after this many seconds")
+    parser.add_option("--max-attempts", type = "int",
+                      help = "give up placing the words of a puzzle after this many attempts")
+    parser.add_option("--parallel-starts", type = "int",
+                      help = "run this many differently seeded attempts at each puzzle at once.  Puzzles "
+                             "are then generated one at a time")
+    parser.add_option("--keep", type = "choice", choices = KEEP_CHOICES, default = KEEP_FIRST,
+                      help = "which grid to keep of those found by --parallel-starts: " + ", ".join(KEEP_CHOICES) +
+                             ".  The first stops the search as soon as one attempt succeeds; the others "
+                             "use every attempt, or keep going until --time-budget [default: %default]")
+    parser.add_option("--hidden-message", help = "fill the empty cells with this message")
+    parser.add_option("--solution", dest = "show_solution", action = "store_true", default = False,
+                      help = "mark the solution in the exported puzzles")
+    parser.add_option("--summary", help = "write a tab separated summary to this file")
+    parser.add_option("--bank", help = "add the puzzles to this puzzle bank, creating it if necessary")
+    parser.add_option("--text-file", help = "also write all the puzzles, one after another, to this text file")
+    parser.set_defaults(force_size = None)
+    options, paths = parser.parse_args(argv)
+
+    if not paths:
+        parser.error("no wordlists given")
+    options.formats = [file_format.strip().lower() for file_format in options.formats.split(',') if file_format.strip()]
+    for file_format in options.formats:
+        if file_format not in FORMATS:
+            parser.error("unknown format: " + file_format)
+    if options.formats and not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+
+    jobs = [(source, options) for source in find_sources(paths)]
+    if options.bank:
+        bank = PuzzleBankWriter(options.bank)
+    else:
+        bank = None
+    if options.text_file:
+        text_file = open(options.text_file, 'w')
+    else:
+        text_file = None
+    text_count = 0
+    start_time = time.time()
+    if options.processes > 1 and not options.parallel_starts > 1:
+        #Each worker loads cairo and pango once, before its first puzzle
+        pool = multiprocessing.Pool(options.processes, warm_up, (options.formats,))
+        outcomes = pool.imap_unordered(generate, jobs)
+    else:
+        #Parallel starts run in a pool of their own, which the workers of another pool can't create
+        pool = None
+        outcomes = itertools.imap(generate, jobs)
+    results = []
+    for result in outcomes:
+        if 'puzzle_data' in result:
+            puzzle_data = result.pop('puzzle_data')
+            if bank:
+                bank.append_data(puzzle_data)
+            if text_file:
+                #Written as each puzzle arrives, so nothing builds up in memory
+                if text_count:
+                    text_file.write(TEXT_SEPARATOR)
+                fileformat.loads(puzzle_data).write_text(text_file, options.show_solution, True, True, True)
+                text_count += 1
+        results.append(result)
+        print format_result(result)
+    if pool:
+        pool.close()
+        pool.join()
+    if bank:
+        bank.close()
+    if text_file:
+        text_file.close()
+    write_summary(results, time.time() - start_time, options.summary)
+
+    if [result for result in results if not result['placed'] or result['error']]:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
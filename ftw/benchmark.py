@@ -0,0 +1,191 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import math
+import optparse
+import os
+import random
+import string
+import subprocess
+import sys
+import time
+
+from ftw import fileformat
+from ftw.batch import build_puzzle, parse_size
+
+USAGE = """%prog [options]
+
+Measure how long it takes to import the modules used without a display.  With
+--words, time the generation, saving, loading and export of ever larger puzzles
+made from random words instead, and show how the time grows with the number of
+words.  Growth close to 1 is linear; 2 is quadratic."""
+
+#Run in a fresh interpreter so that nothing has been imported already
+IMPORT_SCRIPT = """
+import sys, time
+start = time.time()
+import %s
+elapsed = time.time() - start
+print elapsed, int('pango' in sys.modules), int('gtk' in sys.modules)
+"""
+
+#Modules loaded by a worker that generates puzzles and exports text, but never draws
+HEADLESS_MODULES = "ftw.puzzle, ftw.export, ftw.batch"
+
+
+def measure_import_time(modules = HEADLESS_MODULES, repeat = 5):
+    """Returns the best time in seconds taken to import modules in a new interpreter, and
+    whether pango and gtk were loaded as a side effect"""
+    package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best_time = None
+    for i in range(0, repeat):
+        process = subprocess.Popen([sys.executable, "-c", IMPORT_SCRIPT % modules],
+                                   cwd = package_path, stdout = subprocess.PIPE)
+        output = process.communicate()[0].split()
+        elapsed = float(output[0])
+        if best_time is None or elapsed < best_time:
+            best_time = elapsed
+    return best_time, output[1] == '1', output[2] == '1'
+
+
+#Stages timed for each puzzle, in order
+STAGES = ("generate", "save", "load", "text", "pdf")
+
+
+def make_words(count, seed, min_length = 4, max_length = 12):
+    """Returns count random (word, clue) pairs.  The same seed gives the same words"""
+    word_random = random.Random(seed)
+    words = []
+    for i in range(0, count):
+        length = word_random.randint(min_length, max_length)
+        word = ''.join([word_random.choice(string.ascii_lowercase) for j in range(0, length)])
+        words.append((word, None))
+    return words
+
+
+def time_puzzle(word_count, seed, force_size = None, pdf_filename = None):
+    """Generate and export one puzzle of word_count random words.  Returns a dictionary
+    of the seconds taken by each of STAGES, with the generation result and grid size.
+    The pdf stage is left out if pdf_filename is None"""
+    timings = {}
+    words = make_words(word_count, seed)
+    start_time = time.time()
+    puzzle, placed = build_puzzle("benchmark", words, force_size, seed = seed)
+    timings['generate'] = time.time() - start_time
+
+    start_time = time.time()
+    puzzle_data = fileformat.dumps(puzzle)
+    timings['save'] = time.time() - start_time
+
+    start_time = time.time()
+    fileformat.loads(puzzle_data)
+    timings['load'] = time.time() - start_time
+
+    start_time = time.time()
+    null_file = open(os.devnull, 'w')
+    puzzle.write_text(null_file, True, True, True, True)
+    null_file.close()
+    timings['text'] = time.time() - start_time
+
+    if pdf_filename:
+        from ftw.export import write_pdf
+        start_time = time.time()
+        write_pdf(puzzle, pdf_filename, True)
+        timings['pdf'] = time.time() - start_time
+    return {'words': word_count, 'grid_size': tuple(puzzle.grid.get_grid_size()), 'placed': placed,
+            'timings': timings}
+
+
+def get_growth(first, last, stage):
+    """Returns the exponent k for which the time of stage grows as (number of words) ** k
+    between two results from time_puzzle(), or None if it can't be measured"""
+    if stage not in first['timings'] or stage not in last['timings']:
+        return None
+    first_seconds = first['timings'][stage]
+    last_seconds = last['timings'][stage]
+    if first_seconds <= 0 or last_seconds <= 0 or last['words'] == first['words']:
+        return None
+    return math.log(last_seconds / first_seconds) / math.log(float(last['words']) / first['words'])
+
+
+def format_result(result):
+    """Returns one line of the table from format_results()"""
+    cells = []
+    for stage in STAGES:
+        if stage in result['timings']:
+            cells.append("%8.3fs" % result['timings'][stage])
+        else:
+            cells.append("%9s" % "-")
+    return "%7d %9s %11s " % (result['words'], "%dx%d" % result['grid_size'],
+                              "%d/%d" % (result['placed'].placed_words, result['words'])) + " ".join(cells)
+
+
+def format_results(results):
+    """Returns a table of results from time_puzzle() as lines of text, followed by the
+    growth of each stage between the smallest and largest puzzles"""
+    lines = ["%7s %9s %11s " % ("words", "grid", "placed") +
+             " ".join(["%9s" % stage for stage in STAGES])]
+    for result in results:
+        lines.append(format_result(result))
+    if len(results) > 1:
+        cells = []
+        for stage in STAGES:
+            growth = get_growth(results[0], results[-1], stage)
+            if growth is None:
+                cells.append("%9s" % "-")
+            else:
+                cells.append("%9.2f" % growth)
+        lines.append("%29s " % "growth" + " ".join(cells))
+    return lines
+
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage = USAGE)
+    parser.add_option("-n", "--words",
+                      help = "comma separated numbers of words to try, e.g. 1000,2000,5000,10000")
+    parser.add_option("-s", "--size", dest = "force_size", type = "string", action = "callback",
+                      callback = parse_size, help = "force the grid size, e.g. 500x500")
+    parser.add_option("--seed", type = "int", default = 1,
+                      help = "seed for the words and the grids [default: %default]")
+    parser.add_option("--pdf", help = "also time writing each puzzle to this PDF file")
+    parser.set_defaults(force_size = None)
+    options, args = parser.parse_args(argv)
+
+    if not options.words:
+        elapsed, loaded_pango, loaded_gtk = measure_import_time()
+        print "Headless import of %s: %.1f ms" % (HEADLESS_MODULES, elapsed * 1000)
+        print "pango loaded: %s, gtk loaded: %s" % (loaded_pango, loaded_gtk)
+        return 0
+
+    try:
+        word_counts = [int(count) for count in options.words.split(',')]
+    except ValueError:
+        parser.error("--words expects numbers such as 1000,2000")
+    results = []
+    for word_count in word_counts:
+        results.append(time_puzzle(word_count, options.seed, options.force_size, options.pdf))
+        print format_result(results[-1])
+        sys.stdout.flush()
+    print
+    print "\n".join(format_results(results))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
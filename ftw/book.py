@@ -0,0 +1,144 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import optparse
+import os
+import struct
+import sys
+import tempfile
+import time
+
+from ftw import fileformat
+from ftw.bank import PuzzleBank, is_bank_file
+from ftw.batch import build_puzzle
+from ftw.export import PAGE_HEIGHT, PAGE_MARGIN, PAGE_PPI, PAGE_WIDTH, draw_page
+from ftw.wordlists import find_wordlists, read_wordlist
+
+#Where the answer pages go
+ANSWERS_NONE = "none"
+ANSWERS_EACH = "each"   #straight after each puzzle
+ANSWERS_END = "end"     #all together at the back of the book
+ANSWER_PLACES = (ANSWERS_NONE, ANSWERS_EACH, ANSWERS_END)
+
+#Length of each saved puzzle spooled for the answer pages at the end
+SPOOL_LENGTH = struct.Struct('<I')
+
+USAGE = """%prog [options] -o BOOK.pdf SOURCE...
+
+Print many puzzles into one PDF book, one puzzle per page.  Each SOURCE is a
+FindThatWord file, a puzzle bank, a wordlist file to generate a puzzle from,
+or a directory containing any of these."""
+
+
+def read_puzzles(paths, seed = None, failures = None):
+    """Yields the puzzles from FindThatWord files, puzzle banks and wordlist files named
+    by paths, looking inside directories.  Puzzles are read or generated one at a time.
+    A wordlist whose words don't all fit is left out, and its filename and GenerationResult
+    are appended to failures if it's given"""
+    for filename in find_wordlists(paths):
+        if is_bank_file(filename):
+            bank = PuzzleBank(filename)
+            for record in bank:
+                yield record.get_puzzle()
+            bank.close()
+        elif filename.endswith(".ftw"):
+            yield fileformat.load(filename)
+        else:
+            title = os.path.splitext(os.path.basename(filename))[0]
+            puzzle, placed = build_puzzle(title, read_wordlist(filename), seed = seed)
+            if placed:
+                yield puzzle
+            elif failures is not None:
+                failures.append((filename, placed))
+
+
+def write_book(puzzles, filename, answers = ANSWERS_END, show_title = True,
+               page_width = PAGE_WIDTH, page_height = PAGE_HEIGHT, margin = PAGE_MARGIN):
+    """Write puzzles, which may be any iterable, to a single PDF.  Each page is finished
+    with show_page() as soon as it's drawn, so only one puzzle is held at a time.  With
+    answers at the end, each puzzle is also spooled to a temporary file in its compact saved
+    form, and read back one at a time for the answer pages.  Returns the numbers of
+    puzzles and pages"""
+    import cairo
+    surface = cairo.PDFSurface(filename, page_width, page_height)
+    context = cairo.Context(surface)
+    puzzle_count = 0
+    page_count = 0
+    if answers == ANSWERS_END:
+        spool = tempfile.TemporaryFile()
+    else:
+        spool = None
+    for puzzle in puzzles:
+        draw_page(puzzle, context, page_width, page_height, margin, PAGE_PPI, False, show_title)
+        context.show_page()
+        puzzle_count += 1
+        page_count += 1
+        if answers == ANSWERS_EACH:
+            draw_page(puzzle, context, page_width, page_height, margin, PAGE_PPI, True, show_title)
+            context.show_page()
+            page_count += 1
+        elif answers == ANSWERS_END:
+            puzzle_data = fileformat.dumps(puzzle)
+            spool.write(SPOOL_LENGTH.pack(len(puzzle_data)))
+            spool.write(puzzle_data)
+    if spool is not None:
+        spool.seek(0)
+        for number in xrange(0, puzzle_count):
+            length, = SPOOL_LENGTH.unpack(spool.read(SPOOL_LENGTH.size))
+            draw_page(fileformat.loads(spool.read(length)), context, page_width, page_height, margin, PAGE_PPI,
+                      True, show_title)
+            context.show_page()
+            page_count += 1
+        spool.close()
+    surface.finish()
+    return puzzle_count, page_count
+
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage = USAGE)
+    parser.add_option("-o", "--output", help = "the PDF file to write")
+    parser.add_option("--answers", type = "choice", choices = ANSWER_PLACES, default = ANSWERS_END,
+                      help = "where to put the answer pages: " + ", ".join(ANSWER_PLACES) + " [default: %default]")
+    parser.add_option("--no-titles", dest = "show_title", action = "store_false", default = True,
+                      help = "leave out the puzzle titles and narratives")
+    parser.add_option("--seed", type = "int",
+                      help = "seed for puzzles generated from wordlists")
+    options, paths = parser.parse_args(argv)
+    if not options.output:
+        parser.error("no output file given")
+    if not paths:
+        parser.error("no puzzles given")
+
+    start_time = time.time()
+    failures = []
+    puzzle_count, page_count = write_book(read_puzzles(paths, options.seed, failures), options.output,
+                                          options.answers, options.show_title)
+    elapsed = time.time() - start_time
+    for filename, placed in failures:
+        print "FAILED %s: left out, only %d of %d words fit" % (filename, placed.placed_words, placed.word_count)
+    print "%d puzzles on %d pages in %.2fs, %.1f pages/s" % (puzzle_count, page_count, elapsed,
+                                                              page_count / max(elapsed, 0.001))
+    if failures:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
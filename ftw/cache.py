@@ -0,0 +1,134 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import collections
+import cPickle
+import hashlib
+import os
+import tempfile
+
+from ftw import to_alpha
+
+#Change this whenever the placement algorithm changes, so old results are ignored
+CACHE_VERSION = 2
+
+DEFAULT_MAX_ENTRIES = 1000
+
+
+class GenerationCache(object):
+    """Remembers the placements found by Puzzle.populate_grid() so that the same words,
+    settings and seed don't have to be placed again.  Recently used results are kept in
+    memory, up to max_entries of them.  If directory is given, results are also stored
+    there as one file each, so several processes can share them"""
+
+    def __init__(self, max_entries = DEFAULT_MAX_ENTRIES, directory = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def get_key(self, puzzle):
+        """Returns the key for the current words and settings of puzzle"""
+        grid = puzzle.grid
+        if grid.random_padding:
+            padding = None
+        else:
+            padding = to_alpha(grid.padding)
+        key = (CACHE_VERSION,
+               tuple([word.get_word_alpha() for word in puzzle.get_wordlist()]),
+               puzzle.get_is_forced_size(),
+               tuple(grid.get_grid_size()),
+               padding,
+               puzzle.use_solver,
+               puzzle.max_size_probes,
+               puzzle.max_solver_steps,
+               puzzle.get_seed())
+        return hashlib.sha1(repr(key)).hexdigest()
+
+    def populate_grid(self, puzzle, time_budget = None, max_attempts = None):
+        """Place the words in puzzle, reusing a stored result if there is one.  Returns
+        a GenerationResult as Puzzle.generate_grid() does.  Results cut short by the time
+        budget or maximum attempts aren't stored, as they depend on more than the key"""
+        key = self.get_key(puzzle)
+        result = self.lookup(key)
+        if result is None:
+            self.misses += 1
+            generation_result = puzzle.generate_grid(time_budget, max_attempts)
+            if not generation_result.out_of_budget:
+                self.store(key, (tuple(puzzle.grid.get_grid_size()), puzzle.get_placements(),
+                                 bool(generation_result)))
+        else:
+            self.hits += 1
+            grid_size, placements, placed = result
+            puzzle.grid.set_grid_size(*grid_size)
+            puzzle.set_placements(placements)
+            puzzle.size_probes = 0
+            generation_result = puzzle.get_result()
+        return generation_result
+
+    def lookup(self, key):
+        """Returns the result stored under key, or None"""
+        result = self.entries.pop(key, None)
+        if result is None and self.directory:
+            try:
+                cache_file = open(self.get_filename(key), 'rb')
+                try:
+                    result = cPickle.load(cache_file)
+                finally:
+                    cache_file.close()
+            except (IOError, EOFError, cPickle.UnpicklingError):
+                result = None
+        if result is not None:
+            #Most recently used entries live at the end
+            self.entries[key] = result
+            self.trim()
+        return result
+
+    def store(self, key, result):
+        """Keep result under key, in memory and on disk"""
+        self.entries.pop(key, None)
+        self.entries[key] = result
+        self.trim()
+        if self.directory:
+            #Write to a temporary file first so other processes never see half a result
+            handle, temporary_name = tempfile.mkstemp(dir = self.directory)
+            cache_file = os.fdopen(handle, 'wb')
+            cPickle.dump(result, cache_file, cPickle.HIGHEST_PROTOCOL)
+            cache_file.close()
+            try:
+                os.rename(temporary_name, self.get_filename(key))
+            except OSError:
+                #Another process got there first
+                os.remove(temporary_name)
+
+    def trim(self):
+        """Forget the least recently used entries until there are max_entries left"""
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+
+    def get_filename(self, key):
+        return os.path.join(self.directory, key + ".cache")
+
+    def get_stats(self):
+        """Returns the numbers of hits, misses and entries held in memory"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
@@ -0,0 +1,241 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import multiprocessing
+import optparse
+import os
+import sys
+import time
+
+from ftw import fileformat
+from ftw.bank import PuzzleBank, is_bank_file
+from ftw.wordlists import find_wordlists
+
+#Paper size and margins used when there's no GTK page setup to ask.  Cairo PDF
+#surfaces work in Points (72 Points = 1 inch); these describe A4 with half inch margins
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+PAGE_MARGIN = 36
+PAGE_PPI = 72
+#Resolution of PNG output, which has no page size
+PNG_DPI = 300
+#Written between puzzles when several are written to one text file
+TEXT_SEPARATOR = "\n" + "-" * 72 + "\n\n"
+
+USAGE = """%prog [options] PUZZLE...
+
+Export saved puzzles in several formats at once, sharing the work between all
+the processor cores.  Each PUZZLE is a FindThatWord file, a puzzle bank or a
+directory containing these.  The throughput and the time spent on each format
+are printed at the end."""
+
+
+def write_ftw(puzzle, filename):
+    """Save the puzzle in the format used by the FindThatWord application"""
+    fileformat.save(puzzle, filename)
+
+
+def write_text(puzzle, filename, show_solution = False, show_title = True, show_grid = True, show_words = True):
+    """Write a text file containing the puzzle"""
+    export_file = open(filename, 'w')
+    puzzle.write_text(export_file, show_solution, show_title, show_grid, show_words)
+    export_file.close()
+
+
+def write_pdf(puzzle, filename, show_solution = False, show_title = True, show_grid = True, show_words = True):
+    """Write a one page PDF containing the puzzle"""
+    import cairo
+    surface = cairo.PDFSurface(filename, PAGE_WIDTH, PAGE_HEIGHT)
+    context = cairo.Context(surface)
+    draw_page(puzzle, context, PAGE_WIDTH, PAGE_HEIGHT, PAGE_MARGIN, PAGE_PPI,
+              show_solution, show_title, show_grid, show_words)
+    surface.finish()
+
+
+def write_png(puzzle, filename, show_solution = False, show_title = True, show_grid = True, show_words = True,
+              dpi = PNG_DPI):
+    """Write a PNG image of a page containing the puzzle"""
+    import cairo
+    page_width = PAGE_WIDTH * dpi / PAGE_PPI
+    page_height = PAGE_HEIGHT * dpi / PAGE_PPI
+    surface = cairo.ImageSurface(cairo.FORMAT_RGB24, page_width, page_height)
+    context = cairo.Context(surface)
+    draw_page(puzzle, context, page_width, page_height, PAGE_MARGIN * dpi / PAGE_PPI, dpi,
+              show_solution, show_title, show_grid, show_words)
+    surface.write_to_png(filename)
+
+
+def write_svg(puzzle, filename, show_solution = False, show_title = True, show_grid = True, show_words = True):
+    """Write a one page SVG containing the puzzle"""
+    import cairo
+    surface = cairo.SVGSurface(filename, PAGE_WIDTH, PAGE_HEIGHT)
+    context = cairo.Context(surface)
+    draw_page(puzzle, context, PAGE_WIDTH, PAGE_HEIGHT, PAGE_MARGIN, PAGE_PPI,
+              show_solution, show_title, show_grid, show_words)
+    surface.finish()
+
+
+#Writers for each export format.  ftw files take no display options
+WRITERS = {'ftw': write_ftw, 'txt': write_text, 'pdf': write_pdf, 'png': write_png, 'svg': write_svg}
+FORMATS = ('ftw', 'txt', 'pdf', 'png', 'svg')
+#Formats drawn with cairo and pango
+CAIRO_FORMATS = ('pdf', 'png', 'svg')
+
+
+def write_formats(puzzle, base_name, formats, show_solution = False, timings = None):
+    """Write the puzzle in each of formats to base_name plus the format's extension.
+    Returns a dictionary of the seconds taken by each format.  If timings is given it's
+    filled in as each file is finished, so it's still complete up to an error"""
+    if timings is None:
+        timings = {}
+    for file_format in formats:
+        start_time = time.time()
+        if file_format == 'ftw':
+            write_ftw(puzzle, base_name + '.ftw')
+        else:
+            WRITERS[file_format](puzzle, base_name + '.' + file_format, show_solution)
+        timings[file_format] = time.time() - start_time
+    return timings
+
+
+def warm_up(formats = CAIRO_FORMATS):
+    """Load cairo, pango and the renderer now rather than in the first export.  Used to
+    initialise worker processes, so a missing module is left for the export to report:
+    a pool whose initialiser fails starts new workers for ever"""
+    if [file_format for file_format in formats if file_format in CAIRO_FORMATS]:
+        try:
+            import cairo
+            import ftw.render
+        except ImportError:
+            pass
+
+
+def export_job(job):
+    """Write one encoded puzzle in several formats.  This runs in a worker process, so all
+    errors are caught and reported in the result"""
+    name, puzzle_data, base_name, formats, show_solution = job
+    result = {'name': name, 'timings': {}, 'error': None}
+    try:
+        puzzle = fileformat.loads(puzzle_data)
+        write_formats(puzzle, base_name, formats, show_solution, result['timings'])
+    except Exception, error:
+        result['error'] = "%s: %s" % (error.__class__.__name__, error)
+    return result
+
+
+def export_puzzles(puzzles, output_dir, formats, processes = None, show_solution = False):
+    """Write each of the (name, puzzle) pairs in puzzles to output_dir in every one of
+    formats, sharing the work between a pool of processes.  puzzles may be any iterable
+    and is read as the work proceeds.  Returns the totals described in format_export_stats()"""
+    start_time = time.time()
+    jobs = ((name, fileformat.dumps(puzzle), os.path.join(output_dir, name), formats, show_solution)
+            for name, puzzle in puzzles)
+    pool = multiprocessing.Pool(processes, warm_up, (formats,))
+    #Only the formats that were actually written are timed
+    stats = {'puzzles': 0, 'files': 0, 'errors': [], 'format_seconds': {}}
+    try:
+        for result in pool.imap_unordered(export_job, jobs):
+            stats['puzzles'] += 1
+            if result['error']:
+                stats['errors'].append((result['name'], result['error']))
+            for file_format, seconds in result['timings'].items():
+                stats['files'] += 1
+                stats['format_seconds'][file_format] = stats['format_seconds'].get(file_format, 0.0) + seconds
+    finally:
+        pool.terminate()
+        pool.join()
+    stats['seconds'] = time.time() - start_time
+    return stats
+
+
+def format_export_stats(stats):
+    """Returns the totals from export_puzzles() as lines of text: the puzzles and files
+    written, the throughput and the time spent on each format"""
+    elapsed = max(stats['seconds'], 0.001)
+    lines = ["%d puzzles, %d files in %.2fs: %.1f puzzles/s, %.1f files/s" % (
+                    stats['puzzles'], stats['files'], stats['seconds'],
+                    stats['puzzles'] / elapsed, stats['files'] / elapsed)]
+    for file_format in sorted(stats['format_seconds']):
+        seconds = stats['format_seconds'][file_format]
+        lines.append("  %-4s %8.3fs total, %.4fs per puzzle" % (file_format, seconds,
+                                                               seconds / max(stats['puzzles'], 1)))
+    for name, error in stats['errors']:
+        lines.append("  FAILED %s: %s" % (name, error))
+    return lines
+
+
+def read_saved_puzzles(paths):
+    """Yields a (name, puzzle) pair for each puzzle in the FindThatWord files and puzzle
+    banks named by paths, looking inside directories.  Puzzles are read one at a time"""
+    for filename in find_wordlists(paths):
+        base_name = os.path.splitext(os.path.basename(filename))[0]
+        if is_bank_file(filename):
+            bank = PuzzleBank(filename)
+            for number, record in enumerate(bank):
+                yield "%s-%05d" % (base_name, number), record.get_puzzle()
+            bank.close()
+        elif filename.endswith(".ftw"):
+            yield base_name, fileformat.load(filename)
+
+
+def draw_page(puzzle, context, page_width, page_height, margin, dpi,
+              show_solution = False, show_title = True, show_grid = True, show_words = True):
+    """Fill a page with a white background and draw the puzzle inside its margins"""
+    context.set_source_rgb(1, 1, 1)
+    context.rectangle(0, 0, page_width, page_height)
+    context.fill()
+    puzzle.draw_as_cairo(context, margin, margin,
+                         page_width - 2 * margin, page_height - 2 * margin,
+                         dpi, show_solution, None,
+                         show_title, show_grid, show_words)
+
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage = USAGE)
+    parser.add_option("-o", "--output-dir", default = ".",
+                      help = "directory for the exported files [default: %default]")
+    parser.add_option("-f", "--formats", default = "txt,pdf",
+                      help = "comma separated output formats from " + ", ".join(FORMATS) + " [default: %default]")
+    parser.add_option("-j", "--processes", type = "int", default = multiprocessing.cpu_count(),
+                      help = "number of worker processes [default: %default]")
+    parser.add_option("--solution", dest = "show_solution", action = "store_true", default = False,
+                      help = "mark the solution in the exported puzzles")
+    options, paths = parser.parse_args(argv)
+    if not paths:
+        parser.error("no puzzles given")
+    formats = [file_format.strip().lower() for file_format in options.formats.split(',') if file_format.strip()]
+    if not formats:
+        parser.error("no formats given")
+    for file_format in formats:
+        if file_format not in FORMATS:
+            parser.error("unknown format: " + file_format)
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+
+    stats = export_puzzles(read_saved_puzzles(paths), options.output_dir, formats,
+                           options.processes, options.show_solution)
+    for line in format_export_stats(stats):
+        print line
+    if stats['errors']:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+Layout of a saved puzzle.  All numbers are little-endian.
+
+    header      HEADER, see below
+    metadata    title, narrative and hidden message, each a uint32 length then the bytes
+    words       for each word, the word and then the clue, each a uint16 length then the bytes
+    placements  for each word a PLACEMENT: the encoded location from ftw.locations,
+                or -1 if the word isn't placed, then a reserved byte
+    grid        the letters placed in the grid, one byte per cell in rows, then the
+                padding letters in the same layout
+
+The header gives the length of every section, so the title or word count can be read
+without decoding the rest.
+"""
+
+import cPickle
+import struct
+
+from ftw import to_alpha
+from ftw.grid import Grid, BLANK
+from ftw.locations import decode_location, encode_location, ALL_DIRECTIONS
+from ftw.puzzle import Puzzle, DEFAULT_SETTINGS
+from ftw.word import Word
+
+MAGIC = "FTWP"
+VERSION = 1
+
+#magic, version, flags, grid x size, grid y size, forced x size, forced y size,
+#maximum size probes, word count, seed, maximum solver steps, metadata length,
+#words length, total length of the record
+HEADER = struct.Struct('<4sHHHHHHHIIIIII')
+PLACEMENT = struct.Struct('<ib')
+LONG_LENGTH = struct.Struct('<I')
+SHORT_LENGTH = struct.Struct('<H')
+
+FLAG_FORCED_SIZE = 1
+FLAG_RANDOM_PADDING = 2
+FLAG_USE_SOLVER = 4
+
+
+class FileFormatError(Exception):
+    """Raised when data isn't a puzzle that this version can read"""
+
+
+def pack_string(value, length_format):
+    """Returns value preceded by its length"""
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return length_format.pack(len(value)) + value
+
+
+def dumps(puzzle):
+    """Returns puzzle encoded as a string"""
+    grid = puzzle.grid
+    grid_x_size, grid_y_size = grid.get_grid_size()
+    if grid.padding_dirty:
+        grid.add_padding()
+
+    metadata = ''.join([pack_string(puzzle.get_title(), LONG_LENGTH),
+                        pack_string(puzzle.get_narrative(), LONG_LENGTH),
+                        pack_string(grid.padding, LONG_LENGTH)])
+    words = []
+    placements = []
+    for word in puzzle.get_wordlist():
+        words.append(pack_string(word.get_word(), SHORT_LENGTH))
+        words.append(pack_string(word.get_clue(), SHORT_LENGTH))
+        x, y = word.get_coordinates()
+        direction = tuple(word.get_direction())
+        if x is None or direction not in ALL_DIRECTIONS:
+            location = -1
+        else:
+            location = encode_location(x, y, ALL_DIRECTIONS.index(direction), grid_x_size)
+        placements.append(PLACEMENT.pack(location, 0))
+    words = ''.join(words)
+    placements = ''.join(placements)
+    cells = str(grid.cells) + str(grid.padding_cells)
+
+    flags = 0
+    if puzzle.get_is_forced_size():
+        flags |= FLAG_FORCED_SIZE
+    if grid.random_padding:
+        flags |= FLAG_RANDOM_PADDING
+    if puzzle.use_solver:
+        flags |= FLAG_USE_SOLVER
+    length = HEADER.size + len(metadata) + len(words) + len(placements) + len(cells)
+    header = HEADER.pack(MAGIC, VERSION, flags, grid_x_size, grid_y_size,
+                         puzzle.force_x, puzzle.force_y, puzzle.max_size_probes,
+                         puzzle.get_word_count(), puzzle.get_seed(), puzzle.max_solver_steps,
+                         len(metadata), len(words), length)
+    return ''.join([header, metadata, words, placements, cells])
+
+
+def loads(data):
+    """Returns the puzzle encoded in data by dumps().  Puzzles pickled by older versions
+    of FindThatWord are also accepted"""
+    if is_puzzle_data(data):
+        return PuzzleRecord(data).get_puzzle()
+    return cPickle.loads(data)
+
+
+def save(puzzle, filename):
+    """Write puzzle to a file"""
+    puzzle_file = open(filename, 'wb')
+    puzzle_file.write(dumps(puzzle))
+    puzzle_file.close()
+
+
+def load(filename):
+    """Returns the puzzle read from a file"""
+    puzzle_file = open(filename, 'rb')
+    data = puzzle_file.read()
+    puzzle_file.close()
+    return loads(data)
+
+
+def is_puzzle_data(data, offset = 0):
+    """Returns True if data holds a puzzle encoded by dumps() at offset"""
+    return data[offset:offset + len(MAGIC)] == MAGIC
+
+
+class PuzzleRecord(object):
+    """Read-only view of a puzzle encoded by dumps().  Only the header is decoded up
+    front; everything else is decoded when it's asked for.  data can be a string, a
+    buffer or an mmap, and the record may start part way through it"""
+
+    def __init__(self, data, offset = 0):
+        if not is_puzzle_data(data, offset):
+            raise FileFormatError("not a FindThatWord puzzle")
+        (magic, version, self.flags, self.grid_x_size, self.grid_y_size,
+         self.force_x, self.force_y, self.max_size_probes, self.word_count, self.seed,
+         self.max_solver_steps, metadata_length, words_length, self.length) = HEADER.unpack_from(data, offset)
+        if version > VERSION:
+            raise FileFormatError("puzzle saved by a newer version of FindThatWord")
+        self.data = data
+        self.metadata_offset = offset + HEADER.size
+        self.words_offset = self.metadata_offset + metadata_length
+        self.placements_offset = self.words_offset + words_length
+        self.grid_offset = self.placements_offset + self.word_count * PLACEMENT.size
+        self.metadata = None
+        self.wordlist = None
+
+    def read_string(self, offset, length_format):
+        """Returns the string at offset and the offset of whatever follows it"""
+        length = length_format.unpack_from(self.data, offset)[0]
+        offset += length_format.size
+        return self.data[offset:offset + length], offset + length
+
+    def get_metadata(self):
+        """Returns the title, narrative and hidden message"""
+        if self.metadata is None:
+            offset = self.metadata_offset
+            title, offset = self.read_string(offset, LONG_LENGTH)
+            narrative, offset = self.read_string(offset, LONG_LENGTH)
+            padding, offset = self.read_string(offset, LONG_LENGTH)
+            self.metadata = (title, narrative, padding)
+        return self.metadata
+
+    def get_title(self):
+        return self.get_metadata()[0]
+
+    def get_narrative(self):
+        return self.get_metadata()[1]
+
+    def get_grid_size(self):
+        return self.grid_x_size, self.grid_y_size
+
+    def get_word_count(self):
+        return self.word_count
+
+    def get_seed(self):
+        return self.seed
+
+    def get_wordlist(self):
+        """Returns a list of (word, clue) pairs"""
+        if self.wordlist is None:
+            self.wordlist = []
+            offset = self.words_offset
+            for i in range(0, self.word_count):
+                word, offset = self.read_string(offset, SHORT_LENGTH)
+                clue, offset = self.read_string(offset, SHORT_LENGTH)
+                self.wordlist.append((word, clue))
+        return self.wordlist
+
+    def get_placements(self):
+        """Returns a list of the encoded location of each word, or -1 for unplaced words"""
+        return [PLACEMENT.unpack_from(self.data, self.placements_offset + i * PLACEMENT.size)[0]
+                for i in range(0, self.word_count)]
+
+    def get_cells(self):
+        """Returns the placed letters and the padding letters, one byte per cell"""
+        cell_count = self.grid_x_size * self.grid_y_size
+        return (self.data[self.grid_offset:self.grid_offset + cell_count],
+                self.data[self.grid_offset + cell_count:self.grid_offset + 2 * cell_count])
+
+    def get_puzzle(self):
+        """Returns a new Puzzle built from the record.  No constructors are run and
+        nothing is generated"""
+        title, narrative, padding = self.get_metadata()
+
+        puzzle = Puzzle.__new__(Puzzle)
+        puzzle.__dict__.update(DEFAULT_SETTINGS)
+        puzzle.title = title
+        puzzle.narrative = narrative
+        puzzle.is_forced_size = bool(self.flags & FLAG_FORCED_SIZE)
+        puzzle.force_x = self.force_x
+        puzzle.force_y = self.force_y
+        puzzle.use_solver = bool(self.flags & FLAG_USE_SOLVER)
+        puzzle.max_solver_steps = self.max_solver_steps
+        puzzle.max_size_probes = self.max_size_probes
+        puzzle.set_seed(self.seed)
+
+        grid = Grid.__new__(Grid)
+        grid.puzzle = puzzle
+        grid.padding = padding
+        grid.random_padding = bool(self.flags & FLAG_RANDOM_PADDING)
+        grid.set_grid_size(self.grid_x_size, self.grid_y_size)
+        cells, padding_cells = self.get_cells()
+        grid.blank_cells = bytearray(BLANK * len(cells))
+        grid.cells = bytearray(cells)
+        grid.padding_cells = bytearray(padding_cells)
+        grid.padding_dirty = False
+        grid.index_letters()
+        puzzle.grid = grid
+
+        puzzle.wordlist = []
+        puzzle.longest_word = 0
+        puzzle.total_letters = 0
+        for (text, clue), location in zip(self.get_wordlist(), self.get_placements()):
+            word = Word.__new__(Word)
+            word.puzzle = puzzle
+            word.word = text
+            word.clue = clue
+            word.word_alpha = to_alpha(text)
+            word.length = len(word.word_alpha)
+            if location < 0:
+                word.clear()
+            else:
+                x, y, x_dir, y_dir = decode_location(location, self.grid_x_size)
+                word.set_coordinates(x, y)
+                word.set_direction(x_dir, y_dir)
+            puzzle.wordlist.append(word)
+            puzzle.longest_word = max(puzzle.longest_word, word.length)
+            puzzle.total_letters += word.length
+        puzzle.index_lines()
+        return puzzle
@@ -1,14 +1,11 @@
-import copy
 import random
 import string
 
 from ftw import to_alpha
 
-BG_COLOUR = (1, 1, 1)
-GRID_COLOUR = (0.5, 0.5, 0.5)
-WORD_COLOUR = (0.75, 0.0, 0.0, 0.3)
-SELECTED_COLOUR = (0.5, 0.0, 0.75, 0.6)
-PADDING_COLOUR = (0, 0, 0)
+#Letters are stored one byte per cell, with a space marking an empty cell
+BLANK = ' '
+BLANK_CODE = ord(BLANK)
 
 
 class Grid(object):
@@ -22,16 +19,69 @@ class Grid(object):
         self.padding = ''
         self.random_padding = True
         self.puzzle = puzzle
+        self.blank_cells = bytearray()
         self.clear()
 
+    def __setstate__(self, state):
+        """Convert grids pickled with the old list-of-lists layout to flat buffers"""
+        self.padding_dirty = False
+        self.__dict__.update(state)
+        if 'array' in state:
+            x_size, y_size = self.get_grid_size()
+            self.width = x_size
+            self.blank_cells = bytearray(BLANK * (x_size * y_size))
+            self.cells = bytearray(self.blank_cells)
+            self.padding_cells = bytearray(self.blank_cells)
+            for x in range(0, x_size):
+                for y in range(0, y_size):
+                    self.cells[y * x_size + x] = ord(self.array[x][y])
+                    self.padding_cells[y * x_size + x] = ord(self.array_padding[x][y])
+            del self.array
+            del self.array_padding
+        if 'letter_cells' not in state:
+            self.index_letters()
+        if 'line_cells' not in state:
+            #Filled in from the words by Puzzle.index_lines()
+            self.line_cells = bytearray(len(self.cells))
+
     def clear(self):
         """Clear the grid"""
         x_size, y_size = self.get_grid_size()
-        self.array = []
-        for i in range(0, x_size):
-            self.array.append([' '] * y_size)
-        self.array_padding = copy.deepcopy(self.array)
-        self.add_padding()
+        if len(self.blank_cells) != x_size * y_size:
+            self.blank_cells = bytearray(BLANK * (x_size * y_size))
+            self.cells = bytearray(self.blank_cells)
+            self.padding_cells = bytearray(self.blank_cells)
+        else:
+            #Same size as before, so reuse the existing buffers
+            self.cells[:] = self.blank_cells
+        self.letter_cells = {}
+        #The LINE_BITS of the words covering each cell
+        self.line_cells = bytearray(len(self.cells))
+        #The padding is worked out the next time it's needed
+        self.padding_dirty = True
+
+    def snapshot(self):
+        """Returns a copy of the letters placed in the grid, and the lines they lie
+        along, which can later be passed to restore()"""
+        letter_cells = dict([(letter, set(cells)) for letter, cells in self.letter_cells.items()])
+        return (tuple(self.grid_size), bytes(self.cells), bytes(self.line_cells), letter_cells)
+
+    def restore(self, snapshot):
+        """Return the grid to the state captured by snapshot()"""
+        grid_size, cells, line_cells, letter_cells = snapshot
+        self.set_grid_size(grid_size[0], grid_size[1])
+        if len(self.cells) != len(cells):
+            self.clear()
+        self.cells[:] = cells
+        self.line_cells[:] = line_cells
+        #The snapshot may be restored again, so its index is copied
+        self.letter_cells = dict([(letter, set(cells)) for letter, cells in letter_cells.items()])
+        if not self.random_padding:
+            self.padding_dirty = True
+
+    def get_index(self, x, y):
+        """Returns the position of cell (x,y) in the grid buffers"""
+        return y * self.width + x
 
     def get_cell(self, x, y, result_type = "words"):
         """Return the content of reference (x,y).
@@ -40,48 +90,101 @@ class Grid(object):
                 padding = padding letters
                 both = both types of content"""
 
+        index = y * self.width + x
         if result_type == "words":
-            return self.array[x][y]
-        elif result_type == "padding":
-            return self.array_padding[x][y]
-        elif self.array[x][y] == ' ':
-            return self.array_padding[x][y]
+            return chr(self.cells[index])
+        if self.padding_dirty:
+            self.add_padding()
+        if result_type == "padding":
+            return chr(self.padding_cells[index])
+        elif self.cells[index] == BLANK_CODE:
+            return chr(self.padding_cells[index])
         else:
-            return self.array[x][y]
+            return chr(self.cells[index])
+
+    def get_row(self, y, result_type = "words"):
+        """Return the contents of row y as a string.  result_type is as for get_cell()"""
+        start = y * self.width
+        end = start + self.width
+        if result_type == "words":
+            return str(self.cells[start:end])
+        if self.padding_dirty:
+            self.add_padding()
+        if result_type == "padding":
+            return str(self.padding_cells[start:end])
+        row = self.cells[start:end]
+        if BLANK_CODE in row:
+            row = bytearray([letter if letter != BLANK_CODE else padding
+                             for letter, padding in zip(row, self.padding_cells[start:end])])
+        return str(row)
 
     def set_cell(self, x, y, letter):
-        self.array[x][y] = letter
+        index = y * self.width + x
+        old_letter = chr(self.cells[index])
+        if old_letter == letter:
+            return
+        if old_letter != BLANK:
+            self.letter_cells[old_letter].discard(index)
+        if letter != BLANK:
+            self.letter_cells.setdefault(letter, set()).add(index)
+        self.cells[index] = ord(letter)
+        #A hidden message flows around the words, so it has to be laid out again
+        if not self.random_padding:
+            self.padding_dirty = True
+
+    def get_letter_cells(self, letter):
+        """Returns the set of indices of the cells holding letter"""
+        return self.letter_cells.get(letter, ())
+
+    def index_letters(self):
+        """Rebuild the index from each letter to the cells that hold it"""
+        self.letter_cells = {}
+        for index, code in enumerate(self.cells):
+            if code != BLANK_CODE:
+                self.letter_cells.setdefault(chr(code), set()).add(index)
 
     def add_padding(self):
         """populate the empty cells in the grid with a hidden message"""
 
-        x_size, y_size = self.get_grid_size()
-        padding = self.get_padding_text()
-        for row in range(0, y_size):
-            self.array.append([])
-            for column in range(0, x_size):
-                if self.array[column][row] == ' ' or self.random_padding:
-                    self.array_padding[column][row] = padding[0]
-                    padding = padding[1:]
-                    if len(padding) == 0 and self.random_padding:
-                        padding = self.get_padding_text()
-                    elif len(padding) == 0:
-                        padding = [' '] * 20
+        cell_count = len(self.cells)
+        if self.random_padding:
+            #Every cell gets a letter, taken from a series of shuffled alphabets.  They're
+            #shuffled by a generator of their own so that the same seed gives the same padding
+            padding_random = random.Random(self.puzzle.seed)
+            padding = []
+            while len(padding) < cell_count:
+                padding.extend(self.get_padding_text(padding_random))
+            self.padding_cells[:] = ''.join(padding[:cell_count])
+        else:
+            #The message runs through the empty cells in turn, and any left over are blank
+            message = bytearray(self.get_padding_text())
+            message_length = len(message)
+            cells = self.cells
+            padding_cells = self.padding_cells
+            position = 0
+            for index in xrange(0, cell_count):
+                if cells[index] == BLANK_CODE and position < message_length:
+                    padding_cells[index] = message[position]
+                    position += 1
                 else:
-                    self.array_padding[column][row] = ' '
+                    padding_cells[index] = BLANK_CODE
+        self.padding_dirty = False
 
     def get_grid_size(self):
         return self.grid_size
 
     def set_grid_size(self, x, y):
+        """Change the grid dimensions.  The grid must be cleared before it is used again"""
         self.grid_size = [x, y]
+        self.width = x
 
-    def get_padding_text(self):
-        """Return the hidden message to be used for blank cells"""
+    def get_padding_text(self, padding_random = None):
+        """Return the hidden message to be used for blank cells.  Random padding is
+        shuffled with padding_random, or the puzzle's random generator if not given"""
 
         if self.random_padding:
             padding = list(string.ascii_lowercase)
-            random.shuffle(padding)
+            (padding_random or self.puzzle.random).shuffle(padding)
         else:
             padding = to_alpha(self.padding)
             if padding == '':
@@ -91,79 +194,6 @@ class Grid(object):
     def draw_as_cairo(self, surface, start_x, start_y, size_x, size_y, show_solution, selected_word, max_cell_size):
         """Renders the grid onto a cairo surface.
             Returns the font size used and the actual grid height"""
-
-        #The size of the font relative to the size of the grid
-        FONT_SIZE = 0.75
-
-        #Calculate the optimum size of each cell
-        cells_x, cells_y = self.get_grid_size()
-        cell_size = min(max_cell_size, size_x / cells_x, size_y / cells_y)
-        cell_size = int(cell_size)
-        grid_x_size = cell_size * cells_x
-        grid_y_size = cell_size * cells_y
-        x_offset = 0.5 + int(start_x) + int((size_x - grid_x_size) / 2)
-        y_offset = 0.5 + int(start_y)
-
-        #Draw the grid
-        surface.set_source_rgb(BG_COLOUR[0], BG_COLOUR[1], BG_COLOUR[2])
-        surface.set_line_width(1)
-        surface.set_source_rgb(GRID_COLOUR[0], GRID_COLOUR[1], GRID_COLOUR[2])
-
-        for x in range(0, cells_x + 1):
-            surface.move_to(x_offset + x * cell_size, y_offset)
-            surface.rel_line_to(0, grid_y_size)
-            surface.stroke()
-
-        for y in range(0, cells_y + 1):
-            surface.move_to(x_offset, y_offset + y * cell_size)
-            surface.rel_line_to(grid_x_size, 0)
-            surface.stroke()
-
-        #Draw the letters in the grid
-        surface.set_font_size(cell_size * FONT_SIZE)
-        fascent, fdescent, fheight, fxadvance, fyadvance = surface.font_extents()
-        font_y_offset = float( cell_size + fheight ) / 2 - fdescent
-
-        for x in range(0, cells_x):
-            for y in range(0, cells_y):
-                letter = self.get_cell(x, y)
-
-                #Decide what colour to display
-                if show_solution and letter != " ":
-                    r, g, b, a = WORD_COLOUR
-                else:
-                    r, g, b = PADDING_COLOUR
-                surface.set_source_rgb(r, g, b)
-
-                #Fetch padding if not part of a word
-                if letter == " ":
-                    letter = self.get_cell(x, y, "padding")
-
-                #Display the letter
-                xbearing, ybearing, width, height, xadvance, yadvance = surface.text_extents(letter)
-                font_x_offset = float(cell_size - width) / 2 - xbearing
-                surface.move_to(x_offset + x * cell_size + font_x_offset
-                                    , y_offset + y * cell_size + font_y_offset)
-                surface.show_text(letter)
-
-       #Draw the solution lines
-        if show_solution:
-            surface.set_line_width(cell_size * 0.3)
-            for word in self.puzzle.get_wordlist():
-                x, y = word.get_coordinates()
-                if x is not None:
-                    if word == selected_word:
-                        r, g, b, a = SELECTED_COLOUR
-                    else:
-                        r, g, b, a = WORD_COLOUR
-                    surface.set_source_rgba(r, g, b, a)
-                    x_dir, y_dir = word.get_direction()
-                    word_length = word.get_length() - 1
-                    surface.move_to(x_offset + (x + 0.5) * cell_size
-                                        , y_offset + (y + 0.5) * cell_size)
-                    surface.rel_line_to(x_dir * word_length * cell_size
-                                            , y_dir * word_length * cell_size)
-                    surface.stroke()
-
-        #Return the font size that we used
-        return grid_y_size
\ No newline at end of file
+        #The renderer needs pango, so only load it when something is drawn
+        from ftw.render import draw_grid
+        return draw_grid(self, surface, start_x, start_y, size_x, size_y, show_solution, selected_word, max_cell_size)
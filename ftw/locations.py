@@ -0,0 +1,136 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from array import array
+
+ALL_DIRECTIONS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+#A bit for the line each direction runs along.  Opposite directions are at opposite ends
+#of ALL_DIRECTIONS and share a bit
+LINE_BITS = tuple([1 << min(direction_id, len(ALL_DIRECTIONS) - 1 - direction_id)
+                   for direction_id in range(0, len(ALL_DIRECTIONS))])
+#A single letter lies along every line through its cell
+ALL_LINES = sum(set(LINE_BITS))
+
+#A location is encoded as (start cell index << DIRECTION_BITS) | direction code
+DIRECTION_BITS = 3
+DIRECTION_MASK = (1 << DIRECTION_BITS) - 1
+
+#Number of (width, height, length) entries kept before the caches are emptied
+MAX_CACHED = 64
+
+_locations = {}
+_covers = {}
+
+
+def get_locations(width, height, length):
+    """Returns an array of every location where a word of the given length would fit
+    in an empty grid.  The array is shared, so callers must copy it before changing it"""
+    key = (width, height, length)
+    locations = _locations.get(key)
+    if locations is None:
+        if len(_locations) >= MAX_CACHED:
+            _locations.clear()
+        locations = array('l')
+        for direction_id, (x_start, x_end, y_start, y_end) in enumerate(get_direction_ranges(width, height, length)):
+            for y in range(y_start, y_end + 1):
+                for x in range(x_start, x_end + 1):
+                    locations.append(((y * width + x) << DIRECTION_BITS) | direction_id)
+        _locations[key] = locations
+    return locations
+
+
+def get_direction_ranges(width, height, length):
+    """Returns the first and last x and y of the start of a word of the given length in
+    each of ALL_DIRECTIONS"""
+    ranges = []
+    for x_dir, y_dir in ALL_DIRECTIONS:
+        ranges.append((max(0, -x_dir * (length - 1)), min(width - 1, width - 1 - x_dir * (length - 1)),
+                       max(0, -y_dir * (length - 1)), min(height - 1, height - 1 - y_dir * (length - 1))))
+    return ranges
+
+
+def iter_random_locations(width, height, length, location_random):
+    """Yields the locations from get_locations() in a random order chosen by
+    location_random, working out each one as it's needed.  The time and memory used
+    grow with the number of locations taken rather than the size of the grid"""
+    #The number of start cells in each direction, in get_locations() order
+    counts = []
+    for x_start, x_end, y_start, y_end in get_direction_ranges(width, height, length):
+        counts.append((max(0, x_end - x_start + 1), max(0, y_end - y_start + 1), x_start, y_start))
+    total = sum([x_count * y_count for x_count, y_count, x_start, y_start in counts])
+
+    #A shuffle of the location numbers that only records the positions it has swapped
+    swapped = {}
+    for i in xrange(0, total):
+        j = i + int(location_random.random() * (total - i))
+        number = swapped.get(j, j)
+        swapped[j] = swapped.pop(i, i)
+        for direction_id, (x_count, y_count, x_start, y_start) in enumerate(counts):
+            if number < x_count * y_count:
+                y, x = divmod(number, x_count)
+                yield (((y + y_start) * width + x + x_start) << DIRECTION_BITS) | direction_id
+                break
+            number -= x_count * y_count
+
+
+def get_cover(width, height, length):
+    """Returns a list for each cell of the locations from get_locations() that cover it.
+    Each entry is encoded as location number * length + letter position"""
+    key = (width, height, length)
+    cover = _covers.get(key)
+    if cover is None:
+        if len(_covers) >= MAX_CACHED:
+            _covers.clear()
+        cover = [[] for cell in range(0, width * height)]
+        for location_id, location in enumerate(get_locations(width, height, length)):
+            start, step = get_start_and_step(location, width)
+            for position in range(0, length):
+                cover[start + position * step].append(location_id * length + position)
+        _covers[key] = cover
+    return cover
+
+
+def get_line_bits(direction_id, length):
+    """Returns the LINE_BITS of a word of the given length running in the direction
+    ALL_DIRECTIONS[direction_id].  No other word may share a cell with a word running
+    along the same line, so one word can never be hidden inside another"""
+    if length == 1:
+        return ALL_LINES
+    return LINE_BITS[direction_id]
+
+
+def encode_location(x, y, direction_id, width):
+    """Returns the encoded location of a word starting at (x, y) running in the direction
+    ALL_DIRECTIONS[direction_id]"""
+    return ((y * width + x) << DIRECTION_BITS) | direction_id
+
+
+def decode_location(location, width):
+    """Returns the x and y coordinates and the x and y directions of an encoded location"""
+    start = location >> DIRECTION_BITS
+    x_dir, y_dir = ALL_DIRECTIONS[location & DIRECTION_MASK]
+    return start % width, start // width, x_dir, y_dir
+
+
+def get_start_and_step(location, width):
+    """Returns the start cell index of an encoded location, and the change in cell index
+    from one letter to the next"""
+    x_dir, y_dir = ALL_DIRECTIONS[location & DIRECTION_MASK]
+    return location >> DIRECTION_BITS, y_dir * width + x_dir
@@ -0,0 +1,164 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import multiprocessing
+import Queue
+import time
+
+from ftw import fileformat
+from ftw.grid import BLANK
+from ftw.puzzle import MAX_SEED
+
+#What to keep when several attempts succeed
+KEEP_FIRST = "first"        #stop as soon as any attempt succeeds
+KEEP_SMALLEST = "smallest"  #the grid with the fewest cells
+KEEP_DENSEST = "densest"    #the grid with the largest share of cells used by words
+KEEP_CHOICES = (KEEP_FIRST, KEEP_SMALLEST, KEEP_DENSEST)
+
+#Attempts made per process when no limit is given
+DEFAULT_ATTEMPTS_PER_PROCESS = 4
+
+#Longest wait for a result when there's no time budget.  Waiting without a timeout
+#can't be interrupted from the keyboard
+LONGEST_WAIT = 24 * 60 * 60
+
+
+def run_attempt(puzzle_data, seed, max_attempts = None):
+    """Generate the grid of an encoded puzzle with one seed, making at most max_attempts
+    attempts to place the words.  This runs in a worker process, so all errors are caught
+    and reported in the result"""
+    start_time = time.time()
+    result = {'seed': seed, 'placed': False, 'placed_words': 0, 'error': None}
+    try:
+        puzzle = fileformat.loads(puzzle_data)
+        puzzle.set_seed(seed)
+        generation_result = puzzle.generate_grid(None, max_attempts)
+        result['placed'] = bool(generation_result)
+        result['placed_words'] = generation_result.placed_words
+        result['grid_size'] = tuple(puzzle.grid.get_grid_size())
+        result['placements'] = puzzle.get_placements()
+        result['occupied'] = len(puzzle.grid.cells) - puzzle.grid.cells.count(BLANK)
+    except Exception, error:
+        result['error'] = "%s: %s" % (error.__class__.__name__, error)
+    result['seconds'] = time.time() - start_time
+    return result
+
+
+class MultiStart(object):
+    """Places the words of a puzzle by running independent, differently seeded attempts
+    in a pool of processes.
+
+    Seeds follow on from the puzzle's own seed.  The winning seed is stored in the
+    puzzle, so populate_grid() regenerates the same grid later.  Each attempt makes at
+    most the puzzle's max_attempts attempts to place the words"""
+
+    def __init__(self, puzzle, processes = None, max_attempts = None, time_budget = None, keep = KEEP_FIRST):
+        """max_attempts limits the number of seeds tried.  time_budget is an optional
+        limit in seconds on the whole search; attempts still running then are abandoned"""
+        self.puzzle = puzzle
+        self.processes = processes or multiprocessing.cpu_count()
+        if max_attempts is None:
+            if time_budget is None or keep == KEEP_FIRST:
+                max_attempts = self.processes * DEFAULT_ATTEMPTS_PER_PROCESS
+            else:
+                max_attempts = MAX_SEED
+        self.max_attempts = max_attempts
+        self.time_budget = time_budget
+        self.keep = keep
+        self.attempts = 0
+        self.seconds = 0.0
+        self.best = None
+        self.best_partial = None
+
+    def populate_grid(self):
+        """Place all words on the puzzle grid.  If no attempt places them all, the one that
+        placed the most is kept.  Returns a GenerationResult, which is True if successful"""
+        start_time = time.time()
+        if self.time_budget is None:
+            deadline = None
+        else:
+            deadline = start_time + self.time_budget
+        puzzle_data = fileformat.dumps(self.puzzle)
+        first_seed = self.puzzle.get_seed()
+        results = Queue.Queue()
+        pool = multiprocessing.Pool(self.processes)
+        submitted = 0
+        running = 0
+        self.attempts = 0
+        self.best = None
+        self.best_partial = None
+        out_of_budget = False
+        try:
+            while True:
+                #Keep every process busy
+                while running < self.processes and submitted < self.max_attempts \
+                        and (deadline is None or time.time() < deadline):
+                    seed = (first_seed + submitted) % MAX_SEED
+                    pool.apply_async(run_attempt, (puzzle_data, seed, self.puzzle.max_attempts),
+                                     callback = results.put)
+                    submitted += 1
+                    running += 1
+                if running == 0:
+                    out_of_budget = self.best is None
+                    break
+                if deadline is None:
+                    timeout = LONGEST_WAIT
+                else:
+                    timeout = max(deadline - time.time(), 0)
+                try:
+                    result = results.get(timeout = timeout)
+                except Queue.Empty:
+                    out_of_budget = self.best is None
+                    break
+                running -= 1
+                self.attempts += 1
+                if result['placed'] and self.is_better(result):
+                    self.best = result
+                    if self.keep == KEEP_FIRST:
+                        break
+                elif not result['error'] and (self.best_partial is None
+                                              or result['placed_words'] > self.best_partial['placed_words']):
+                    self.best_partial = result
+        finally:
+            #Abandon any attempts still running
+            pool.terminate()
+            pool.join()
+
+        kept = self.best or self.best_partial
+        if kept:
+            self.puzzle.set_seed(kept['seed'])
+            self.puzzle.grid.set_grid_size(*kept['grid_size'])
+            self.puzzle.set_placements(kept['placements'])
+        self.seconds = time.time() - start_time
+        return self.puzzle.get_result(self.attempts, self.seconds, out_of_budget)
+
+    def is_better(self, result):
+        """Returns True if result should replace the best result so far"""
+        if self.best is None:
+            return True
+        x_size, y_size = result['grid_size']
+        best_x_size, best_y_size = self.best['grid_size']
+        area = x_size * y_size
+        best_area = best_x_size * best_y_size
+        density = float(result['occupied']) / area
+        best_density = float(self.best['occupied']) / best_area
+        if self.keep == KEEP_DENSEST:
+            return (density, -area) > (best_density, -best_area)
+        return (area, -density) < (best_area, -best_density)
@@ -20,17 +20,76 @@ Copyright 2009 Jonny Jones and Ieuan Jones
 """
 
 import copy
+import heapq
 import math
-import pango
-import pangocairo
-from ftw.grid import Grid
+import random
+import StringIO
+import time
+from ftw.grid import BLANK_CODE, Grid
+from ftw.locations import DIRECTION_MASK, decode_location, get_line_bits, get_locations, get_start_and_step
+from ftw.solver import Solver, DEFAULT_MAX_STEPS
 from ftw.word import Word
 
+#Seeds are chosen from 0 to MAX_SEED - 1
+MAX_SEED = 2 ** 32
+
+#Number of random attempts to fit the words into a grid of one size
+ATTEMPTS_PER_SIZE = 20
+#Number of grid sizes tried before automatic sizing gives up
+DEFAULT_MAX_SIZE_PROBES = 16
+#Grids with more cells than this are filled in large puzzle mode, which looks at a
+#sample of the grid for each word rather than all of it
+LARGE_GRID_CELLS = 2500
+
+#Settings added since the first release, used to fill in the gaps when older puzzles are loaded
+DEFAULT_SETTINGS = {'use_solver': False,
+                    'max_solver_steps': DEFAULT_MAX_STEPS,
+                    'proven_unsolvable': False,
+                    'max_size_probes': DEFAULT_MAX_SIZE_PROBES,
+                    'size_probes': 0,
+                    'cache': None,
+                    'progress': None,
+                    'time_budget': None,
+                    'max_attempts': None,
+                    'deadline': None,
+                    'attempt_limit': None,
+                    'attempts': 0,
+                    'best_partial': None}
+
+#What generate_grid() achieved
+PLACED = "placed"       #every word is in the grid
+PARTIAL = "partial"     #some words are in the grid, placed as in the best attempt
+GAVE_UP = "gave up"     #no words are in the grid
+
+
+class GenerationResult(object):
+    """The outcome of generating a puzzle's grid.  It is True only if every word was placed,
+    so it can be used wherever populate_grid() used to return True or False"""
+
+    def __init__(self, status, placed_words, word_count, grid_size, attempts, seconds, out_of_budget):
+        self.status = status
+        self.placed_words = placed_words
+        self.word_count = word_count
+        self.grid_size = grid_size
+        self.attempts = attempts
+        self.seconds = seconds
+        #Set if the time budget or maximum attempts ran out
+        self.out_of_budget = out_of_budget
+
+    def __nonzero__(self):
+        return self.status == PLACED
+
+    def __repr__(self):
+        return "<GenerationResult %s: %d of %d words in %dx%d after %d attempts, %.3fs>" % (
+                        (self.status, self.placed_words, self.word_count) + self.grid_size +
+                        (self.attempts, self.seconds))
+
 
 class Puzzle(object):
     """ wordsearch puzzle """
     
     def __init__(self):
+        self.set_seed()
         self.grid = Grid(self)
         self.wordlist = []
         self.title = ""
@@ -40,10 +99,49 @@ class Puzzle(object):
         self.force_y = 10
         self.longest_word = 0
         self.total_letters = 0
+        #Use the backtracking solver rather than random restarts to place the words
+        self.use_solver = False
+        self.max_solver_steps = DEFAULT_MAX_STEPS
+        #Set when the solver has shown that the words cannot fit in the forced grid size
+        self.proven_unsolvable = False
+        #Limit on the grid sizes tried by automatic sizing, and the number tried last time
+        self.max_size_probes = DEFAULT_MAX_SIZE_PROBES
+        self.size_probes = 0
+        #Optional ftw.cache.GenerationCache consulted by populate_grid()
+        self.cache = None
+        #Optional function called with the attempt number and grid size before each attempt
+        #to place the words
+        self.progress = None
+        #Optional limits on the time in seconds and the number of attempts that generate_grid()
+        #may take
+        self.time_budget = None
+        self.max_attempts = None
+        #Limits and progress of the generate_grid() call in progress
+        self.deadline = None
+        self.attempt_limit = None
+        self.attempts = 0
+        self.best_partial = None
         self.resize_grid()
+
+    def __getstate__(self):
+        """The generation cache and progress function aren't saved with the puzzle"""
+        state = self.__dict__.copy()
+        state['cache'] = None
+        state['progress'] = None
+        return state
+
+    def __setstate__(self, state):
+        """Fill in settings missing from puzzles saved by older versions"""
+        self.__dict__.update(DEFAULT_SETTINGS)
+        self.__dict__.update(state)
+        if 'random' not in state:
+            self.set_seed()
+        self.index_lines()
         
-    def add_word(self, name, description = None):
-        """add an individual word to the puzzle"""
+    def add_word(self, name, description = None, rebuild = True):
+        """add an individual word to the puzzle.  If rebuild is False and the word can't be
+        added without regenerating the grid, the word is left unplaced and None is returned;
+        the caller should then call resize_and_rebuild()"""
         
         success = True
         new_word = Word(self, name, description)
@@ -53,33 +151,177 @@ class Puzzle(object):
         if word_length > self.longest_word:
             self.longest_word = word_length
         self.total_letters += word_length
-        self.resize_grid()
+        if rebuild:
+            self.resize_grid()
+        elif tuple(self.grid.get_grid_size()) != self.get_wanted_size():
+            self.wordlist.append(new_word)
+            return None
 
         #Add the word
         self.wordlist.append(new_word)
         placed = new_word.place()
-        if not placed:
+        if not placed and not self.repair_placement(new_word):
+            if not rebuild:
+                new_word.clear()
+                return None
             success = self.populate_grid()
         return success
-            
+
+    def repair_placement(self, new_word, max_blockers = 3, max_attempts = 10):
+        """Try to fit new_word by moving only the few placed words that block its best
+        locations.  Returns True if successful, otherwise the other words are left where
+        they were"""
+        grid = self.grid
+        grid_x_size, grid_y_size = grid.get_grid_size()
+        letters = bytearray(new_word.get_word_alpha())
+
+        #Find which placed words cover each cell
+        owners = {}
+        for word in self.get_wordlist():
+            if word is not new_word:
+                for cell in word.get_cells():
+                    owners.setdefault(cell, []).append(word)
+
+        #Rank the locations by the number of words that would have to move: those with
+        #different letters, and those running along the same line
+        ranked = []
+        length = new_word.get_length()
+        for location in get_locations(grid_x_size, grid_y_size, length):
+            start, step = get_start_and_step(location, grid_x_size)
+            line_bit = get_line_bits(location & DIRECTION_MASK, length)
+            blockers = set()
+            for position, letter in enumerate(letters):
+                cell = start + position * step
+                code = grid.cells[cell]
+                if code != BLANK_CODE and (code != letter or grid.line_cells[cell] & line_bit):
+                    blockers.update(owners[cell])
+                    if len(blockers) > max_blockers:
+                        break
+            else:
+                ranked.append((len(blockers), self.random.random(), location, blockers))
+
+        #Move the blocking words out of the way and put them back elsewhere.  new_word
+        #isn't placed yet, so it mustn't be drawn when the other words are put back
+        new_word.clear()
+        original_placements = self.get_placements()
+        original_grid = grid.snapshot()
+        for blocker_count, tie_break, location, blockers in heapq.nsmallest(max_attempts, ranked):
+            for word in blockers:
+                word.clear()
+            new_word.clear()
+            self.redraw_grid()
+            x, y, x_dir, y_dir = decode_location(location, grid_x_size)
+            new_word.set_coordinates(x, y)
+            new_word.set_direction(x_dir, y_dir)
+            if not new_word.test_draw():
+                #Words that stayed put are in the way after all
+                new_word.clear()
+                self.set_placements(original_placements, original_grid)
+                continue
+            new_word.draw()
+            for word in sorted(blockers, key = lambda word: (-word.get_length(), self.wordlist.index(word))):
+                if not word.place():
+                    break
+            else:
+                return True
+            self.set_placements(original_placements, original_grid)
+        return False
+
+    def get_placements(self):
+        """Returns the coordinates and direction of every word, in wordlist order"""
+        return [(tuple(word.get_coordinates()), tuple(word.get_direction())) for word in self.get_wordlist()]
+
+    def set_placements(self, placements, snapshot = None):
+        """Move every word to the location given by get_placements() and redraw the grid.
+        If snapshot is a grid.snapshot() taken with the words in these locations, the grid
+        is restored from it instead"""
+        for word, (coordinates, direction) in zip(self.get_wordlist(), placements):
+            word.set_coordinates(*coordinates)
+            word.set_direction(*direction)
+        if snapshot is None:
+            self.redraw_grid()
+        else:
+            self.grid.restore(snapshot)
+
+    def index_lines(self):
+        """Record the lines of the placed words in a grid that wasn't drawn by them"""
+        self.grid.line_cells = bytearray(len(self.grid.cells))
+        for word in self.get_wordlist():
+            if word.get_direction()[0] is not None:
+                word.mark_line()
+
+    def redraw_grid(self):
+        """Clear the grid and draw every placed word in it again"""
+        self.grid.clear()
+        for word in self.get_wordlist():
+            word.draw()
+
+    def redraw_fitting_words(self):
+        """Clear the grid and draw again every placed word that lies inside it and agrees
+        with the letters of the words drawn before it.  Any other word is left unplaced.
+        Used when the placements can't be trusted"""
+        self.grid.clear()
+        grid_x_size, grid_y_size = self.grid.get_grid_size()
+        for word in self.get_wordlist():
+            x, y = word.get_coordinates()
+            x_dir, y_dir = word.get_direction()
+            if x is None or x_dir is None:
+                continue
+            end_x = x + x_dir * (word.get_length() - 1)
+            end_y = y + y_dir * (word.get_length() - 1)
+            fits = (0 <= x < grid_x_size and 0 <= y < grid_y_size
+                    and 0 <= end_x < grid_x_size and 0 <= end_y < grid_y_size)
+            if fits:
+                for cell, letter in zip(word.get_cells(), bytearray(word.get_word_alpha())):
+                    if self.grid.cells[cell] not in (BLANK_CODE, letter):
+                        fits = False
+                        break
+            if fits:
+                word.draw()
+            else:
+                word.clear()
+
+    def add_words(self, words, place = True):
+        """add a list of (word, description) pairs and place them all together.
+        Returns False if all words not placed.  If place is False, the grid is only
+        resized and cleared, and the words are left for the caller to place"""
+        for name, description in words:
+            self.wordlist.append(Word(self, name, description))
+        if not place:
+            self.measure_words()
+            self.grid.set_grid_size(*self.get_wanted_size())
+            self.clear_wordlist()
+            return None
+        return self.resize_and_rebuild()
+
     def get_word(self, word_id):
         """Returns the word object with position in list given by word_id"""
         return self.wordlist[word_id]
             
-    def delete_word(self, word_id):
-        """Removes the word with an index of word_id"""
+    def delete_word(self, word_id, rebuild = True):
+        """Removes the word with an index of word_id.  If rebuild is False, the grid is
+        left for the caller to regenerate with resize_and_rebuild()"""
         self.wordlist = self.wordlist[ : word_id ] + self.wordlist[ word_id + 1 : ]
-        self.resize_and_rebuild()
+        if rebuild:
+            self.resize_and_rebuild()
+        else:
+            self.measure_words()
         
     def resize_and_rebuild(self):
         """A word has changed.  Recalculate everything.  Returns false if all words not placed"""
+        self.measure_words()
+        if tuple(self.grid.get_grid_size()) != self.get_wanted_size():
+            #Resizing places the words, so there's no need to do it twice
+            return self.resize_grid()
+        return self.populate_grid()        
+
+    def measure_words(self):
+        """Recalculate the length of the longest word and the total number of letters"""
         self.longest_word = 0
         self.total_letters = 0
         for word in self.get_wordlist():
             self.longest_word = max( self.longest_word, word.get_length() )
             self.total_letters += word.get_length()
-        self.resize_grid()
-        return self.populate_grid()        
 
     def move_word_up(self, word_id):
         """Moves the word with an index of word_id up one place"""
@@ -107,58 +349,195 @@ class Puzzle(object):
     def resize_grid(self):
         """Resize the grid and place all the words in it"""
         current_x_size, current_y_size = self.grid.get_grid_size()
+        new_x_size, new_y_size = self.get_wanted_size()
         result = True
-        if not self.get_is_forced_size():
-            #Automatic grid size
-            new_size = self.get_optimum_size()
-            if current_x_size <> new_size or current_y_size <> new_size:
-                #The grid size needs to change
-                self.grid.set_grid_size(new_size, new_size)
-                self.force_x = new_size
-                self.force_y = new_size
-                result = self.populate_grid()
-        else:
-            #Manual grid size
-            if current_x_size <> self.force_x or current_y_size <> self.force_y:
-                #The grid size needs to change
-                self.grid.set_grid_size(self.force_x, self.force_y)
-                result = self.populate_grid()
+        if current_x_size <> new_x_size or current_y_size <> new_y_size:
+            #The grid size needs to change
+            self.grid.set_grid_size(new_x_size, new_y_size)
+            if not self.get_is_forced_size():
+                self.force_x = new_x_size
+                self.force_y = new_y_size
+            result = self.populate_grid()
         return result
+
+    def get_wanted_size(self):
+        """Returns the grid size that resize_grid() would choose"""
+        if self.get_is_forced_size():
+            return self.force_x, self.force_y
+        new_size = self.get_optimum_size()
+        return new_size, new_size
     
-    def populate_grid(self):
-        """Place all words on the puzzle grid.  Returns True if ssuccessful"""
-        
-        placed = False     #all words have been placed successfully
-        finished = False   #stop attempting to place words and return
+    def populate_grid(self, time_budget = None, max_attempts = None):
+        """Place all words on the puzzle grid.  Returns True if ssuccessful.  See
+        generate_grid() for the arguments and the result"""
+        if self.cache is not None:
+            return self.cache.populate_grid(self, time_budget, max_attempts)
+        return self.generate_grid(time_budget, max_attempts)
+
+    def generate_grid(self, time_budget = None, max_attempts = None):
+        """Place all words on the puzzle grid, bypassing the cache.  time_budget is a limit
+        in seconds and max_attempts a limit on the number of attempts to place the words;
+        they default to the puzzle's time_budget and max_attempts.  The time is checked
+        before each word is placed, and in the solver every few hundred steps.  If the
+        limits run out, the best partial placement found is kept.  Returns a
+        GenerationResult, which is True if successful"""
         
-        while not finished:
-            #if not forced size, keep trying different grid sizes until successful
-            wordlist = copy.copy(self.wordlist)
-            wordlist.sort(cmp = lambda x, y: cmp(-x.get_length(), -y.get_length()))
-            i = 0
-            while i < 20 and not placed:
-                #Repeatedly attempt to fit the words into the grid before giving up
-                self.clear_wordlist()
-                i += 1
-                for word in wordlist:
-                    placed = word.place()
-                    if not placed:
-                        word.clear()
-                        break
-                else:
-                    placed = True
-            
-            if placed or self.get_is_forced_size():
-                #Success or give up
-                finished = True
+        start_time = time.time()
+        if time_budget is None:
+            time_budget = self.time_budget
+        if max_attempts is None:
+            max_attempts = self.max_attempts
+        if time_budget is None:
+            self.deadline = None
+        else:
+            self.deadline = start_time + time_budget
+        self.attempt_limit = max_attempts
+        self.attempts = 0
+        self.best_partial = None
+        self.proven_unsolvable = False
+        self.size_probes = 0
+        #Start from the seed each time, so that the same words always give the same grid
+        self.random.seed(self.seed)
+        if self.get_is_forced_size():
+            placed = self.place_all_words()
+        else:
+            #if not forced size, look for the smallest grid size that works
+            placed = self.search_grid_size()
+        out_of_budget = not placed and self.out_of_budget()
+        if not placed and self.best_partial is not None:
+            placed_words, grid_size, placements = self.best_partial
+            self.grid.set_grid_size(*grid_size)
+            self.set_placements(placements)
+        self.deadline = None
+        self.attempt_limit = None
+        self.best_partial = None
+        return self.get_result(self.attempts, time.time() - start_time, out_of_budget)
+
+    def get_result(self, attempts = 0, seconds = 0.0, out_of_budget = False):
+        """Returns a GenerationResult describing the words currently placed in the grid"""
+        placed_words = len([word for word in self.get_wordlist() if word.get_coordinates()[0] is not None])
+        if placed_words == self.get_word_count():
+            status = PLACED
+        elif placed_words:
+            status = PARTIAL
+        else:
+            status = GAVE_UP
+        return GenerationResult(status, placed_words, self.get_word_count(), tuple(self.grid.get_grid_size()),
+                                attempts, seconds, out_of_budget)
+
+    def out_of_budget(self):
+        """Returns True if the time or attempts allowed for generate_grid() have run out"""
+        if self.attempt_limit is not None and self.attempts >= self.attempt_limit:
+            return True
+        return self.past_deadline()
+
+    def past_deadline(self):
+        """Returns True if the time allowed for generate_grid() has run out"""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def keep_partial(self, placed_words):
+        """Remember the current placement if it places more words than any before"""
+        if placed_words and (self.best_partial is None or placed_words > self.best_partial[0]):
+            self.best_partial = (placed_words, tuple(self.grid.get_grid_size()), self.get_placements())
+
+    def place_all_words(self):
+        """Place all words in the grid at its current size.  Returns True if successful"""
+        placed = False
+        self.size_probes += 1
+        wordlist = copy.copy(self.wordlist)
+        wordlist.sort(cmp = lambda x, y: cmp(-x.get_length(), -y.get_length()))
+        i = 0
+        while i < ATTEMPTS_PER_SIZE and not placed and not self.out_of_budget():
+            #Repeatedly attempt to fit the words into the grid before giving up
+            self.clear_wordlist()
+            i += 1
+            self.attempts += 1
+            self.report_progress(i)
+            for placed_words, word in enumerate(wordlist):
+                #A single attempt at a large grid can take a while, so the clock is
+                #watched as it goes
+                placed = not self.past_deadline() and word.place()
+                if not placed:
+                    word.clear()
+                    self.keep_partial(placed_words)
+                    break
             else:
-                #Try a larger grid
-                current_x_size, current_y_size = self.grid.get_grid_size()
-                self.grid.set_grid_size(current_x_size + 1, current_y_size + 1)
-                self.grid.clear
-        
+                placed = True
+        if not placed and self.use_solver and not self.out_of_budget():
+            #The random attempts are quick and often enough; when they fail, an exhaustive
+            #search takes over
+            solver = Solver(self, self.max_solver_steps, self.deadline)
+            self.attempts += 1
+            self.report_progress(i + 1)
+            placed = solver.solve()
+            self.proven_unsolvable = solver.exhausted
+            if not placed:
+                self.keep_partial(solver.placed_words)
         return placed
+
+    def report_progress(self, attempt):
+        """Pass the attempt number and grid size to the progress function, if there is one"""
+        if self.progress is not None:
+            self.progress(attempt, tuple(self.grid.get_grid_size()))
+
+    def search_grid_size(self):
+        """Find the smallest square grid, no smaller than the current one, in which all
+        the words fit.  The grid grows in ever larger steps until the words fit, then the
+        gap between the last failure and the first success is bisected.  At most
+        max_size_probes sizes are tried, none bigger than one with a row for every letter.
+        Returns True if successful"""
+        failed_size = self.grid.get_grid_size()[0] - 1
+        size = failed_size + 1
+        #Every word fits on a row of its own in a grid this big
+        largest_size = max(size, self.longest_word + self.total_letters)
+        step = 1
+        best_size = None
+        while best_size is None and self.size_probes < self.max_size_probes and not self.out_of_budget():
+            self.grid.set_grid_size(size, size)
+            if self.place_all_words():
+                best_size = size
+                best_placements = self.get_placements()
+                best_grid = self.grid.snapshot()
+            else:
+                failed_size = size
+                if size >= largest_size:
+                    break
+                size = min(size + step, largest_size)
+                step *= 2
+        if best_size is None:
+            return False
+
+        while best_size - failed_size > 1 and self.size_probes < self.max_size_probes and not self.out_of_budget():
+            size = (failed_size + best_size) // 2
+            self.grid.set_grid_size(size, size)
+            if self.place_all_words():
+                best_size = size
+                best_placements = self.get_placements()
+                best_grid = self.grid.snapshot()
+            else:
+                failed_size = size
+
+        if self.grid.get_grid_size()[0] != best_size:
+            self.set_placements(best_placements, best_grid)
+        return True
     
+    def get_seed(self):
+        return self.seed
+
+    def set_seed(self, seed = None):
+        """Change the seed used to generate the grid.  With no seed, a new one is chosen
+        at random.  populate_grid() always gives the same result for the same seed,
+        words and grid size settings"""
+        if seed is None:
+            seed = random.SystemRandom().randrange(MAX_SEED)
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    def is_large(self):
+        """Returns True if the grid is filled in large puzzle mode"""
+        x_size, y_size = self.grid.get_grid_size()
+        return x_size * y_size > LARGE_GRID_CELLS
+
     def get_is_forced_size(self):
         return self.is_forced_size
     
@@ -187,203 +566,52 @@ class Puzzle(object):
     
     def draw_as_text(self, show_solution, show_title, show_grid, show_words):
         """Returns puzzle as a string for subsequent export"""
-        
+        exported_text = StringIO.StringIO()
+        self.write_text(exported_text, show_solution, show_title, show_grid, show_words)
+        return exported_text.getvalue()
+
+    def write_text(self, stream, show_solution, show_title, show_grid, show_words):
+        """Writes the text of draw_as_text() to stream, a file or anything else with a write
+        method, a line at a time.  Every grid row is written, including rows left blank by
+        a short hidden message, which come out as empty lines"""
+        write = stream.write
+
         #Add the puzle title and narrative if required
-        exported_text = ""
         if self.get_title() and show_title:
-            exported_text = self.get_title()
-            exported_text += "\n"
-            exported_text += "=" * len(self.get_title())
-            exported_text += "\n\n"
+            write(self.get_title() + "\n" + "=" * len(self.get_title()) + "\n\n")
 
         if self.get_narrative() and show_title:
-            exported_text += self.get_narrative()
-            exported_text += "\n\n"
-            
+            write(self.get_narrative() + "\n\n")
+
         #Export the puzzle grid if required
         if show_grid:
-            cells_x, cells_y = self.grid.get_grid_size()
+            cells_y = self.grid.get_grid_size()[1]
             for y in range(0, cells_y):
-                for x in range(0, cells_x):
-                    exported_text += self.grid.get_cell(x, y, "both") + " "
-                exported_text = exported_text.strip()
-                exported_text += "\n"
-            exported_text += "\n"
-        
+                #Blank padding at the end of a row is left out
+                write(" ".join(self.grid.get_row(y, "both")).rstrip() + "\n")
+            write("\n")
+
         #Export the wordlist if required
         if show_words:
             for word in self.get_wordlist():
-                exported_text += word.get_clue()
+                line = word.get_clue()
                 if show_solution:
-                    exported_text += '('
+                    line += '('
                     if word.get_clue() != word.get_word():
-                        exported_text += word.get_word()
+                        line += word.get_word()
                     word_location_x, word_location_y = word.get_coordinates()
                     if word_location_x is not None and word_location_y is not None:
-                        exported_text += str(word_location_x + 1) + "," + str(word_location_y + 1)
+                        line += str(word_location_x + 1) + "," + str(word_location_y + 1)
                     else:
-                        exported_text += "unplaced"
-                    exported_text += ")"
-                exported_text += "\n"
-        return exported_text
-    
+                        line += "unplaced"
+                    line += ")"
+                write(line + "\n")
+
     def draw_as_cairo(self, surface, start_x, start_y, size_x, size_y, dpi,
                       show_solution = True, selected_word = None, 
                       show_title = True, show_grid = True, show_words = True):
         """Draws the entire puzzle onto the Cairo surface.  dpi specifies the number of pixels per inch"""
-        
-        #Cairo assumes that a pixel is a point, but that's not true for all all of our surfaces.  We calculate
-        #a scale to allow us to convert points to pixels.  72 points = 1 inch
-        scale = dpi / 72
-        surface.set_source_rgb(0, 0, 0)
-        y_position = start_y
-        drawn_grid = False
-        surface.move_to(start_x, start_y)
-        
-        #Relative size of displayed components compared with grid letters and word list
-        BASE_FONT_POINTS = 16
-        TITLE_SCALE = 1.4
-        NARRATIVE_SCALE = 0.8
-        GRID_CELL_SCALE = 2.0
-        SPACING_SCALE = 0.3
-        
-        #Estimate the total number of lines in the output to determine whether the bas font is too large
-        estimated_lines = 0
-        if self.get_title() and show_title:
-            #Assume the title will fit on one line
-            estimated_lines += TITLE_SCALE + SPACING_SCALE
-        if self.get_narrative() and show_title:
-            #crudely assume that we fit 100 characters of narrative per line
-            estimated_lines += NARRATIVE_SCALE * len(self.get_narrative()) / 100 + SPACING_SCALE
-        if show_grid:
-            estimated_lines += self.grid.get_grid_size()[1] * GRID_CELL_SCALE + SPACING_SCALE
-        if show_words:
-            #if we're tight for spce, we'l always use two columns for the word list
-            estimated_lines += self.get_word_count() / 2
-        estimated_lines = max(estimated_lines, 1)
-        #size in points of grid letters and word list.  The 1.2 is a fudge to allow for the font's
-        #ascenders and descenders
-        base_font_size = min(BASE_FONT_POINTS * scale, size_y / estimated_lines / 1.2)
-        
-        #Draw the title if required
-        if self.get_title() and show_title:
-            font_description = pango.FontDescription()
-            font_description.set_family("Sans,Arial,Helvetica")
-            font_description.set_size(int(base_font_size * TITLE_SCALE * pango.SCALE))
-            font_description.set_weight(pango.WEIGHT_BOLD)
-            
-            #Create cairo context and create text layout
-            title_context = pangocairo.CairoContext( surface )
-            title_layout = title_context.create_layout()
-            title_layout.set_width(size_x * pango.SCALE)
-            title_layout.set_justify(False)
-            title_layout.set_alignment(pango.ALIGN_CENTER)
-            title_layout.set_wrap(pango.WRAP_WORD_CHAR)
-            title_layout.set_font_description(font_description)
-            title_layout.set_text( self.get_title() )
-            title_context.show_layout( title_layout )
-            y_position += title_layout.get_pixel_extents()[1][3]
-            y_position += base_font_size * SPACING_SCALE
-        
-        #Draw the narrative if required
-        if self.get_narrative() and show_title:
-            #Set up the narrrative font
-            font_description = pango.FontDescription()
-            font_description.set_family("Sans,Arial,Helvetica")
-            font_description.set_size(int(base_font_size * NARRATIVE_SCALE * pango.SCALE))
-            font_description.set_weight(pango.WEIGHT_NORMAL)
-            
-            #Create cairo context and create text layout
-            narrative_context = pangocairo.CairoContext( surface )
-            narrative_layout = narrative_context.create_layout()
-            narrative_layout.set_width(size_x * pango.SCALE)
-            narrative_layout.set_justify(False)
-            narrative_layout.set_alignment(pango.ALIGN_LEFT)
-            narrative_layout.set_wrap(pango.WRAP_WORD_CHAR)
-            narrative_layout.set_font_description(font_description)
-            narrative_layout.set_text( self.get_narrative() )
-            
-            #Display the narrative
-            narrative_context.move_to(start_x, y_position)
-            narrative_context.show_layout( narrative_layout )
-            y_position += narrative_layout.get_pixel_extents()[1][3]
-            y_position += base_font_size * SPACING_SCALE
-                
-        #Draw the puzzle grid
-        if show_grid:
-            grid_letters_x, grid_letters_y = self.grid.get_grid_size()
-            if show_words:
-                word_count = self.get_word_count()
-            else:
-                word_count = 0
-            #Decide how much space to allocate to the grid
-            grid_ratio = float(grid_letters_y * GRID_CELL_SCALE / (grid_letters_y * GRID_CELL_SCALE + word_count / 2.0))
-            grid_size_y = int((size_y + start_y - y_position) * grid_ratio)
-            grid_size_y = self.grid.draw_as_cairo(surface
-                                        , start_x, y_position
-                                        , size_x, grid_size_y
-                                        , show_solution
-                                        , selected_word
-                                        , base_font_size * GRID_CELL_SCALE)
-            y_position += grid_size_y + base_font_size * SPACING_SCALE
-        word_list_start_y = y_position
-        word_list_start_x = start_x
-        
-        #Draw the list of words if required
-        if show_words:
-            #Set the wordlist font up
-            wordlist_font_size = base_font_size
-            font_description = pango.FontDescription()
-            font_description.set_family("Sans,Arial,Helvetica")
-            font_description.set_size(int(pango.SCALE * wordlist_font_size))
-            font_description.set_weight(pango.WEIGHT_NORMAL)
-            surface.set_source_rgb(0, 0, 0)
-            wordlist_font_size = base_font_size
-            
-            #Create cairo context and create text layout
-            column_width = int(size_x / 2)
-            wordlist_margin = base_font_size * SPACING_SCALE
-            wordlist_context = pangocairo.CairoContext( surface )
-            wordlist_layout = wordlist_context.create_layout()
-            wordlist_layout.set_width(int((column_width - wordlist_margin) * pango.SCALE))
-            wordlist_layout.set_justify(False)
-            wordlist_layout.set_alignment(pango.ALIGN_LEFT)
-            wordlist_layout.set_wrap(pango.WRAP_WORD_CHAR)
-            wordlist_layout.set_font_description(font_description)
-            
-            #Establish whether we need to shrink the font.  We add 1px to the font height because that's sometimes used by Pango
-            #when it lays out the font
-            font_metrics = wordlist_layout.get_context().get_metrics(font_description)
-            font_height = 1 + (font_metrics.get_ascent() + font_metrics.get_descent()) / pango.SCALE
-            available_space = size_y + start_y - y_position
-            words_per_column = int((self.get_word_count() + 1) / 2)
-            if words_per_column * font_height > available_space:
-                wordlist_font_size = available_space * 2 / self.get_word_count() * base_font_size / font_height
-                font_description.set_size(int(pango.SCALE * wordlist_font_size))
-                wordlist_layout.set_font_description(font_description)
-                font_metrics = wordlist_layout.get_context().get_metrics(font_description)
-                font_height = 1 + (font_metrics.get_ascent() + font_metrics.get_descent()) / pango.SCALE
-                
-            #Due to rounding (displayed fonts are always an exact number of pixels), further shrinkage might be necessary:
-            while words_per_column * font_height > available_space:
-                wordlist_font_size += -(100.0 / pango.SCALE)
-                font_description.set_size(int(pango.SCALE * wordlist_font_size))
-                wordlist_layout.set_font_description(font_description)
-                font_metrics = wordlist_layout.get_context().get_metrics(font_description)
-                font_height = 1 + (font_metrics.get_ascent() + font_metrics.get_descent()) / pango.SCALE
-                            
-            #Display the wordlist
-            i = 0
-            for word in self.get_wordlist():
-                display_text = word.get_clue()
-                if show_solution and word.get_clue() != word.get_word():
-                    display_text += " (" + word.get_word() + ")"
-                wordlist_layout.set_text( display_text )
-                wordlist_context.move_to(word_list_start_x, y_position)
-                wordlist_context.show_layout( wordlist_layout )
-                y_position += wordlist_layout.get_pixel_extents()[1][3]
-                i += 1
-                if i == words_per_column:
-                    #Start a new column
-                    word_list_start_x += column_width
-                    y_position = word_list_start_y
+        #The renderer needs pango, so only load it when something is drawn
+        from ftw.render import draw_puzzle
+        draw_puzzle(self, surface, start_x, start_y, size_x, size_y, dpi,
+                    show_solution, selected_word, show_title, show_grid, show_words)
@@ -0,0 +1,343 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import pango
+import pangocairo
+
+BG_COLOUR = (1, 1, 1)
+GRID_COLOUR = (0.5, 0.5, 0.5)
+WORD_COLOUR = (0.75, 0.0, 0.0, 0.3)
+SELECTED_COLOUR = (0.5, 0.0, 0.75, 0.6)
+PADDING_COLOUR = (0, 0, 0)
+
+#Distance from the left of each letter's ink to its centre, keyed by surface type, font size
+#and letter.  Measured once and shared by every render: screen, PNG, PDF, SVG and printer
+_glyph_centres = {}
+MAX_CACHED_GLYPHS = 4096
+
+
+def get_glyph_centre(surface, font_size, letter):
+    """Returns the distance from the current point to the centre of letter as drawn
+    on surface with the current font.  Surfaces of different types may hint text
+    differently, so they're measured separately"""
+    key = (type(surface.get_target()), font_size, letter)
+    centre = _glyph_centres.get(key)
+    if centre is None:
+        if len(_glyph_centres) >= MAX_CACHED_GLYPHS:
+            _glyph_centres.clear()
+        xbearing, ybearing, width, height, xadvance, yadvance = surface.text_extents(letter)
+        centre = float(width) / 2 + xbearing
+        _glyph_centres[key] = centre
+    return centre
+
+
+#Wordlist line heights in pixels keyed by surface type and font size in Pango units, and the
+#heights of laid out clues keyed by surface type, text, font size and layout width
+_line_heights = {}
+_text_heights = {}
+MAX_CACHED_HEIGHTS = 4096
+
+
+def get_line_height(layout, font_description, surface_type):
+    """Returns the height in pixels of a line of text in the layout's font"""
+    key = (surface_type, font_description.get_size())
+    height = _line_heights.get(key)
+    if height is None:
+        if len(_line_heights) >= MAX_CACHED_HEIGHTS:
+            _line_heights.clear()
+        #We add 1px to the font height because that's sometimes used by Pango when it lays out the font
+        font_metrics = layout.get_context().get_metrics(font_description)
+        height = 1 + (font_metrics.get_ascent() + font_metrics.get_descent()) / pango.SCALE
+        _line_heights[key] = height
+    return height
+
+
+def get_text_height(layout, surface_type):
+    """Returns the height in pixels of the text currently in layout"""
+    key = (surface_type, layout.get_text(), layout.get_font_description().get_size(), layout.get_width())
+    height = _text_heights.get(key)
+    if height is None:
+        if len(_text_heights) >= MAX_CACHED_HEIGHTS:
+            _text_heights.clear()
+        height = layout.get_pixel_extents()[1][3]
+        _text_heights[key] = height
+    return height
+
+
+def fit_font_size(layout, font_description, surface_type, lines, available_space):
+    """Sets font_description to the largest size, no larger than its current size, at which
+    the given number of lines fit in available_space pixels"""
+    def fits(size):
+        font_description.set_size(size)
+        return lines * get_line_height(layout, font_description, surface_type) <= available_space
+
+    largest_size = font_description.get_size()
+    if fits(largest_size):
+        return
+    #Line heights are nearly proportional to the font size, so start from a proportional estimate.
+    #Rounding to whole pixels means that the estimate may still be slightly too large
+    largest_height = get_line_height(layout, font_description, surface_type)
+    estimate = max(1, min(largest_size - 1, int(largest_size * available_space / (lines * largest_height))))
+    smallest_size = estimate
+    while smallest_size > 1 and not fits(smallest_size):
+        largest_size = smallest_size
+        smallest_size = max(1, smallest_size * 9 / 10)
+    #Bisect until smallest_size fits and smallest_size + 1 doesn't
+    while largest_size - smallest_size > 1:
+        size = (smallest_size + largest_size) / 2
+        if fits(size):
+            smallest_size = size
+        else:
+            largest_size = size
+    font_description.set_size(smallest_size)
+
+
+def draw_puzzle(puzzle, surface, start_x, start_y, size_x, size_y, dpi,
+                show_solution = True, selected_word = None,
+                show_title = True, show_grid = True, show_words = True):
+    """Draws the entire puzzle onto the Cairo surface.  dpi specifies the number of pixels per inch"""
+    
+    #Cairo assumes that a pixel is a point, but that's not true for all all of our surfaces.  We calculate
+    #a scale to allow us to convert points to pixels.  72 points = 1 inch
+    scale = dpi / 72
+    surface.set_source_rgb(0, 0, 0)
+    y_position = start_y
+    drawn_grid = False
+    surface.move_to(start_x, start_y)
+    
+    #Relative size of displayed components compared with grid letters and word list
+    BASE_FONT_POINTS = 16
+    TITLE_SCALE = 1.4
+    NARRATIVE_SCALE = 0.8
+    GRID_CELL_SCALE = 2.0
+    SPACING_SCALE = 0.3
+    
+    #Estimate the total number of lines in the output to determine whether the bas font is too large
+    estimated_lines = 0
+    if puzzle.get_title() and show_title:
+        #Assume the title will fit on one line
+        estimated_lines += TITLE_SCALE + SPACING_SCALE
+    if puzzle.get_narrative() and show_title:
+        #crudely assume that we fit 100 characters of narrative per line
+        estimated_lines += NARRATIVE_SCALE * len(puzzle.get_narrative()) / 100 + SPACING_SCALE
+    if show_grid:
+        estimated_lines += puzzle.grid.get_grid_size()[1] * GRID_CELL_SCALE + SPACING_SCALE
+    if show_words:
+        #if we're tight for spce, we'l always use two columns for the word list
+        estimated_lines += puzzle.get_word_count() / 2
+    estimated_lines = max(estimated_lines, 1)
+    #size in points of grid letters and word list.  The 1.2 is a fudge to allow for the font's
+    #ascenders and descenders
+    base_font_size = min(BASE_FONT_POINTS * scale, size_y / estimated_lines / 1.2)
+    
+    #Draw the title if required
+    if puzzle.get_title() and show_title:
+        font_description = pango.FontDescription()
+        font_description.set_family("Sans,Arial,Helvetica")
+        font_description.set_size(int(base_font_size * TITLE_SCALE * pango.SCALE))
+        font_description.set_weight(pango.WEIGHT_BOLD)
+        
+        #Create cairo context and create text layout
+        title_context = pangocairo.CairoContext( surface )
+        title_layout = title_context.create_layout()
+        title_layout.set_width(size_x * pango.SCALE)
+        title_layout.set_justify(False)
+        title_layout.set_alignment(pango.ALIGN_CENTER)
+        title_layout.set_wrap(pango.WRAP_WORD_CHAR)
+        title_layout.set_font_description(font_description)
+        title_layout.set_text( puzzle.get_title() )
+        title_context.show_layout( title_layout )
+        y_position += title_layout.get_pixel_extents()[1][3]
+        y_position += base_font_size * SPACING_SCALE
+    
+    #Draw the narrative if required
+    if puzzle.get_narrative() and show_title:
+        #Set up the narrrative font
+        font_description = pango.FontDescription()
+        font_description.set_family("Sans,Arial,Helvetica")
+        font_description.set_size(int(base_font_size * NARRATIVE_SCALE * pango.SCALE))
+        font_description.set_weight(pango.WEIGHT_NORMAL)
+        
+        #Create cairo context and create text layout
+        narrative_context = pangocairo.CairoContext( surface )
+        narrative_layout = narrative_context.create_layout()
+        narrative_layout.set_width(size_x * pango.SCALE)
+        narrative_layout.set_justify(False)
+        narrative_layout.set_alignment(pango.ALIGN_LEFT)
+        narrative_layout.set_wrap(pango.WRAP_WORD_CHAR)
+        narrative_layout.set_font_description(font_description)
+        narrative_layout.set_text( puzzle.get_narrative() )
+        
+        #Display the narrative
+        narrative_context.move_to(start_x, y_position)
+        narrative_context.show_layout( narrative_layout )
+        y_position += narrative_layout.get_pixel_extents()[1][3]
+        y_position += base_font_size * SPACING_SCALE
+            
+    #Draw the puzzle grid
+    if show_grid:
+        grid_letters_x, grid_letters_y = puzzle.grid.get_grid_size()
+        if show_words:
+            word_count = puzzle.get_word_count()
+        else:
+            word_count = 0
+        #Decide how much space to allocate to the grid
+        grid_ratio = float(grid_letters_y * GRID_CELL_SCALE / (grid_letters_y * GRID_CELL_SCALE + word_count / 2.0))
+        grid_size_y = int((size_y + start_y - y_position) * grid_ratio)
+        grid_size_y = draw_grid(puzzle.grid, surface
+                                    , start_x, y_position
+                                    , size_x, grid_size_y
+                                    , show_solution
+                                    , selected_word
+                                    , base_font_size * GRID_CELL_SCALE)
+        y_position += grid_size_y + base_font_size * SPACING_SCALE
+    word_list_start_y = y_position
+    word_list_start_x = start_x
+    
+    #Draw the list of words if required
+    if show_words:
+        #Set the wordlist font up
+        wordlist_font_size = base_font_size
+        font_description = pango.FontDescription()
+        font_description.set_family("Sans,Arial,Helvetica")
+        font_description.set_size(int(pango.SCALE * wordlist_font_size))
+        font_description.set_weight(pango.WEIGHT_NORMAL)
+        surface.set_source_rgb(0, 0, 0)
+        wordlist_font_size = base_font_size
+        
+        #Create cairo context and create text layout
+        column_width = int(size_x / 2)
+        wordlist_margin = base_font_size * SPACING_SCALE
+        wordlist_context = pangocairo.CairoContext( surface )
+        wordlist_layout = wordlist_context.create_layout()
+        wordlist_layout.set_width(int((column_width - wordlist_margin) * pango.SCALE))
+        wordlist_layout.set_justify(False)
+        wordlist_layout.set_alignment(pango.ALIGN_LEFT)
+        wordlist_layout.set_wrap(pango.WRAP_WORD_CHAR)
+        wordlist_layout.set_font_description(font_description)
+        
+        #Shrink the font if the words don't fit
+        surface_type = type(surface.get_target())
+        available_space = size_y + start_y - y_position
+        words_per_column = int((puzzle.get_word_count() + 1) / 2)
+        fit_font_size(wordlist_layout, font_description, surface_type, words_per_column, available_space)
+        wordlist_layout.set_font_description(font_description)
+                        
+        #Display the wordlist
+        i = 0
+        for word in puzzle.get_wordlist():
+            display_text = word.get_clue()
+            if show_solution and word.get_clue() != word.get_word():
+                display_text += " (" + word.get_word() + ")"
+            wordlist_layout.set_text( display_text )
+            wordlist_context.move_to(word_list_start_x, y_position)
+            wordlist_context.show_layout( wordlist_layout )
+            y_position += get_text_height(wordlist_layout, surface_type)
+            i += 1
+            if i == words_per_column:
+                #Start a new column
+                word_list_start_x += column_width
+                y_position = word_list_start_y
+
+
+def draw_grid(grid, surface, start_x, start_y, size_x, size_y, show_solution, selected_word, max_cell_size):
+    """Renders the grid onto a cairo surface.
+        Returns the font size used and the actual grid height"""
+
+    #The size of the font relative to the size of the grid
+    FONT_SIZE = 0.75
+
+    #Calculate the optimum size of each cell
+    cells_x, cells_y = grid.get_grid_size()
+    cell_size = min(max_cell_size, size_x / cells_x, size_y / cells_y)
+    cell_size = int(cell_size)
+    grid_x_size = cell_size * cells_x
+    grid_y_size = cell_size * cells_y
+    x_offset = 0.5 + int(start_x) + int((size_x - grid_x_size) / 2)
+    y_offset = 0.5 + int(start_y)
+
+    #Draw the grid
+    surface.set_source_rgb(BG_COLOUR[0], BG_COLOUR[1], BG_COLOUR[2])
+    surface.set_line_width(1)
+    surface.set_source_rgb(GRID_COLOUR[0], GRID_COLOUR[1], GRID_COLOUR[2])
+
+    #All the lines are stroked as one path, which is one drawing operation in PDF and SVG output
+    for x in range(0, cells_x + 1):
+        surface.move_to(x_offset + x * cell_size, y_offset)
+        surface.rel_line_to(0, grid_y_size)
+
+    for y in range(0, cells_y + 1):
+        surface.move_to(x_offset, y_offset + y * cell_size)
+        surface.rel_line_to(grid_x_size, 0)
+    surface.stroke()
+
+    #Draw the letters in the grid
+    font_size = cell_size * FONT_SIZE
+    surface.set_font_size(font_size)
+    fascent, fdescent, fheight, fxadvance, fyadvance = surface.font_extents()
+    font_y_offset = float( cell_size + fheight ) / 2 - fdescent
+
+    #Sort the letters by colour, so the colour is only set once for each
+    word_letters = []
+    padding_letters = []
+    for x in range(0, cells_x):
+        for y in range(0, cells_y):
+            letter = grid.get_cell(x, y)
+            if letter == " ":
+                #Fetch padding if not part of a word
+                padding_letters.append((x, y, grid.get_cell(x, y, "padding")))
+            elif show_solution:
+                word_letters.append((x, y, letter))
+            else:
+                padding_letters.append((x, y, letter))
+
+    for letters, colour in ((word_letters, WORD_COLOUR), (padding_letters, PADDING_COLOUR)):
+        if not letters:
+            continue
+        surface.set_source_rgb(colour[0], colour[1], colour[2])
+        for x, y, letter in letters:
+            font_x_offset = float(cell_size) / 2 - get_glyph_centre(surface, font_size, letter)
+            surface.move_to(x_offset + x * cell_size + font_x_offset
+                                , y_offset + y * cell_size + font_y_offset)
+            surface.show_text(letter)
+
+   #Draw the solution lines
+    #The lines of each colour are stroked as one path, with the selected word on top
+    if show_solution:
+        surface.set_line_width(cell_size * 0.3)
+        words = grid.puzzle.get_wordlist()
+        for colour, selected in ((WORD_COLOUR, False), (SELECTED_COLOUR, True)):
+            path_empty = True
+            for word in words:
+                x, y = word.get_coordinates()
+                if x is not None and (word == selected_word) == selected:
+                    x_dir, y_dir = word.get_direction()
+                    word_length = word.get_length() - 1
+                    surface.move_to(x_offset + (x + 0.5) * cell_size
+                                        , y_offset + (y + 0.5) * cell_size)
+                    surface.rel_line_to(x_dir * word_length * cell_size
+                                            , y_dir * word_length * cell_size)
+                    path_empty = False
+            if not path_empty:
+                surface.set_source_rgba(colour[0], colour[1], colour[2], colour[3])
+                surface.stroke()
+
+    #Return the font size that we used
+    return grid_y_size
@@ -0,0 +1,269 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import itertools
+import time
+
+from ftw.grid import BLANK, BLANK_CODE
+from ftw.locations import DIRECTION_MASK, decode_location, get_cover, get_line_bits, get_locations, \
+     get_start_and_step
+
+#Number of word placements the solver may try before giving up
+DEFAULT_MAX_STEPS = 20000
+#Number of word placements in the first search, which doubles on each restart
+FIRST_RUN_STEPS = 500
+#Number of word placements between checks of the clock
+DEADLINE_CHECK_STEPS = 256
+
+
+class SearchAbandoned(Exception):
+    """Raised when the solver runs out of steps or time"""
+
+
+class Solver(object):
+    """Backtracking search that places every word of a puzzle in its grid.
+
+    Words are placed depth first, always choosing the unplaced word with the fewest
+    locations left, and trying the locations that cross the most letters already in the
+    grid first.  Placing a word removes the locations of unplaced words that it blocks.
+    When a word runs out of locations, the search jumps back to the most recently placed
+    word that blocked it rather than to the previous word.
+
+    As with Word.test_draw(), a word mustn't share a cell with a word running along the
+    same line.  The rule doesn't depend on the order the words are placed in, so a search
+    that is exhausted shows that the words can't fit"""
+
+    def __init__(self, puzzle, max_steps = DEFAULT_MAX_STEPS, deadline = None):
+        """deadline is an optional time.time() after which the search gives up"""
+        self.puzzle = puzzle
+        self.max_steps = max_steps
+        self.deadline = deadline
+        self.steps = 0
+        #Set when the whole search space was explored without finding a solution
+        self.exhausted = False
+        #Set when the search gave up because the deadline passed
+        self.timed_out = False
+        #Number of words left in the grid by solve()
+        self.placed_words = 0
+
+    def solve(self):
+        """Place all the words in the puzzle's grid.  Returns True if successful.  If not,
+        the grid is left holding the largest set of words placed together during the search"""
+        grid = self.puzzle.grid
+        self.width, self.height = grid.get_grid_size()
+        self.cells = bytearray(BLANK * (self.width * self.height))
+        self.steps = 0
+        self.exhausted = False
+        self.timed_out = False
+
+        #Set up the locations available to each word
+        wordlist = self.puzzle.get_wordlist()
+        self.letters = [bytearray(word.get_word_alpha()) for word in wordlist]
+        self.lengths = [word.get_length() for word in wordlist]
+        self.locations = {}
+        self.location_lines = {}
+        self.covers = {}
+        for length in self.lengths:
+            if length not in self.locations:
+                self.locations[length] = get_locations(self.width, self.height, length)
+                self.location_lines[length] = bytearray([get_line_bits(location & DIRECTION_MASK, length)
+                                                         for location in self.locations[length]])
+                self.covers[length] = get_cover(self.width, self.height, length)
+        self.placement = [None] * len(wordlist)
+        self.best_placement = {}
+
+        #Randomised depth-first searches occasionally get stuck in a barren part of the
+        #search space, so restart with a fresh ordering and a larger step limit each time
+        run_steps = FIRST_RUN_STEPS
+        placed = False
+        while not placed and not self.exhausted and not self.timed_out and self.steps < self.max_steps:
+            self.step_limit = min(self.steps + run_steps, self.max_steps)
+            self.reset_locations()
+            try:
+                placed = self.search() is None
+                self.exhausted = not placed
+            except SearchAbandoned:
+                run_steps *= 2
+
+        #Copy the solution, or the best partial solution, into the puzzle
+        self.puzzle.clear_wordlist()
+        if placed:
+            placement = dict(enumerate(self.placement))
+        else:
+            placement = self.best_placement
+        for word_id, location in placement.items():
+            x, y, x_dir, y_dir = decode_location(self.locations[self.lengths[word_id]][location], self.width)
+            word = wordlist[word_id]
+            word.set_coordinates(x, y)
+            word.set_direction(x_dir, y_dir)
+            word.draw()
+        self.placed_words = len(placement)
+        return placed
+
+    def reset_locations(self):
+        """Make every location available to every word, and shuffle the order in which
+        they will be tried"""
+        self.alive = []
+        self.alive_count = []
+        self.killed_by = []
+        self.order = []
+        self.rank = []
+        self.crossings = []
+        for length in self.lengths:
+            location_count = len(self.locations[length])
+            self.alive.append(bytearray([1]) * location_count)
+            self.alive_count.append(location_count)
+            self.killed_by.append({})
+            order = range(0, location_count)
+            self.puzzle.random.shuffle(order)
+            self.order.append(order)
+            rank = [0] * location_count
+            for position, location in enumerate(order):
+                rank[location] = position
+            self.rank.append(rank)
+            #The number of letters already in the grid that each location would cross
+            self.crossings.append({})
+        self.cells[:] = BLANK * (self.width * self.height)
+        #The word that wrote each cell
+        self.writers = [None] * (self.width * self.height)
+        self.unplaced = set(range(0, len(self.lengths)))
+
+    def get_cells(self, word_id, location):
+        """Returns the cells covered by a word at one of its locations"""
+        length = self.lengths[word_id]
+        start, step = get_start_and_step(self.locations[length][location], self.width)
+        return range(start, start + step * length, step)
+
+    def search(self):
+        """Place the remaining words.  Returns None if successful, otherwise the set of
+        placed words responsible for the failure"""
+        if not self.unplaced:
+            return None
+        word_id = min(self.unplaced, key = lambda i: (self.alive_count[i], -self.lengths[i]))
+        self.unplaced.remove(word_id)
+        conflicts = set(self.killed_by[word_id])
+        alive = self.alive[word_id]
+        crossings = self.crossings[word_id]
+        rank = self.rank[word_id]
+
+        #Locations crossing the most letters first, then the rest in the shuffled order
+        crossing_locations = [location for location, count in crossings.items() if count and alive[location]]
+        crossing_locations.sort(key = lambda location: (-crossings[location], rank[location]))
+        other_locations = (location for location in self.order[word_id] if not crossings.get(location))
+        for location in itertools.chain(crossing_locations, other_locations):
+            if not alive[location]:
+                continue
+            self.steps += 1
+            if self.steps > self.step_limit:
+                raise SearchAbandoned()
+            if self.deadline is not None and self.steps % DEADLINE_CHECK_STEPS == 0 \
+                    and time.time() > self.deadline:
+                self.timed_out = True
+                raise SearchAbandoned()
+            changes, wiped_out = self.assign(word_id, location)
+            placed_count = len(self.lengths) - len(self.unplaced)
+            if placed_count > len(self.best_placement):
+                self.best_placement = dict([(placed_id, self.placement[placed_id])
+                                            for placed_id in range(0, len(self.lengths))
+                                            if placed_id not in self.unplaced])
+            if wiped_out is None:
+                result = self.search()
+                if result is None:
+                    return None
+                if word_id not in result:
+                    #This word played no part in the failure, so jump straight past it
+                    self.unassign(word_id, changes)
+                    self.unplaced.add(word_id)
+                    return result
+                conflicts.update(result)
+            else:
+                conflicts.update(self.killed_by[wiped_out])
+            self.unassign(word_id, changes)
+        conflicts.discard(word_id)
+        self.unplaced.add(word_id)
+        return conflicts
+
+    def assign(self, word_id, location):
+        """Place a word and remove the locations of unplaced words which now clash with it.
+        Returns what was changed, for unassign(), and any word left with no locations"""
+        length = self.lengths[word_id]
+        letters = self.letters[word_id]
+        line_bit = self.location_lines[length][location]
+        word_cells = self.get_cells(word_id, location)
+        self.placement[word_id] = location
+
+        written = []
+        for position, cell in enumerate(word_cells):
+            if self.cells[cell] == BLANK_CODE:
+                self.cells[cell] = letters[position]
+                self.writers[cell] = word_id
+                written.append(cell)
+
+        #Remove the locations of other words that would change one of this word's letters
+        #or run along the same line through one of its cells, and count the crossings of
+        #the rest
+        trail = []
+        crossed = []
+        changes = (written, trail, crossed)
+        for cell in word_cells:
+            letter = self.cells[cell]
+            is_new = self.writers[cell] == word_id
+            for other_id in self.unplaced:
+                other_length = self.lengths[other_id]
+                other_letters = self.letters[other_id]
+                other_alive = self.alive[other_id]
+                other_lines = self.location_lines[other_length]
+                killed = 0
+                for code in self.covers[other_length][cell]:
+                    other_location, position = divmod(code, other_length)
+                    if not other_alive[other_location]:
+                        continue
+                    if other_letters[position] != letter or other_lines[other_location] & line_bit:
+                        other_alive[other_location] = 0
+                        trail.append((other_id, other_location))
+                        killed += 1
+                    elif is_new:
+                        crossings = self.crossings[other_id]
+                        crossings[other_location] = crossings.get(other_location, 0) + 1
+                        crossed.append((other_id, other_location))
+                if killed:
+                    killed_by = self.killed_by[other_id]
+                    killed_by[word_id] = killed_by.get(word_id, 0) + killed
+                    self.alive_count[other_id] -= killed
+                    if self.alive_count[other_id] == 0:
+                        return changes, other_id
+        return changes, None
+
+    def unassign(self, word_id, changes):
+        """Undo assign()"""
+        written, trail, crossed = changes
+        for cell in written:
+            self.cells[cell] = BLANK_CODE
+            self.writers[cell] = None
+        for other_id, other_location in trail:
+            self.alive[other_id][other_location] = 1
+            self.alive_count[other_id] += 1
+            killed_by = self.killed_by[other_id]
+            killed_by[word_id] -= 1
+            if killed_by[word_id] == 0:
+                del killed_by[word_id]
+        for other_id, other_location in crossed:
+            self.crossings[other_id][other_location] -= 1
+        self.placement[word_id] = None
@@ -1,6 +1,10 @@
-import random
-
 from ftw import to_alpha
+from ftw.grid import BLANK_CODE
+from ftw.locations import ALL_DIRECTIONS, decode_location, encode_location, get_line_bits, get_locations, \
+     iter_random_locations
+
+#Number of random cells looked at for letters to cross in large puzzle mode
+LARGE_CROSSING_PROBES = 200
 
 
 class Word(object):
@@ -37,69 +41,142 @@ class Word(object):
                 self.puzzle.grid.set_cell(x, y, letter)
                 x += x_dir
                 y += y_dir
+            self.mark_line()
+
+    def mark_line(self):
+        """record in the grid the line that the word's cells lie along"""
+        grid = self.puzzle.grid
+        line_bit = get_line_bits(ALL_DIRECTIONS.index(tuple(self.get_direction())), self.get_length())
+        for cell in self.get_cells():
+            grid.line_cells[cell] |= line_bit
+
+    def get_cells(self):
+        """Returns the indices of the grid cells covered by the word, or an empty list
+        if the word hasn't been placed"""
+        x, y = self.get_coordinates()
+        x_dir, y_dir = self.get_direction()
+        if x_dir is None or y_dir is None:
+            return []
+        grid_x_size = self.puzzle.grid.get_grid_size()[0]
+        start = y * grid_x_size + x
+        step = y_dir * grid_x_size + x_dir
+        return range(start, start + step * self.get_length(), step)
 
     def test_draw(self):
-        """checks whether the word will fit in the puzzle's grid"""
-        x, y = self.get_coordinates()
+        """checks whether the word will fit in the puzzle's grid.  It may cross matching
+        letters, but mustn't share a cell with a word running along the same line, so no
+        word is hidden inside another.  A word with no letters fits anywhere"""
         x_dir, y_dir = self.get_direction()
-        if x_dir is not None and y_dir is not None:
-            fits = True
-            for letter in self.get_word_alpha():
-                if self.puzzle.grid.get_cell(x, y) not in (' ', letter):
-                    fits = False
-                x += x_dir
-                y += y_dir
-        else:
-            fits = False
-        return fits
+        if x_dir is None or y_dir is None:
+            return False
+        grid = self.puzzle.grid
+        line_bit = get_line_bits(ALL_DIRECTIONS.index((x_dir, y_dir)), self.get_length())
+        for cell, letter in zip(self.get_cells(), bytearray(self.get_word_alpha())):
+            code = grid.cells[cell]
+            if code != BLANK_CODE and (code != letter or grid.line_cells[cell] & line_bit):
+                return False
+        return True
 
     def place(self):
-        """find a free location in the grid and draw the word
+        """find a free location in the grid and draw the word.  Locations where the
+        word crosses matching letters already in the grid are tried first.
         Returns True if successful"""
-        untried_locations = self.get_possible_locations()
+        placed = self.try_locations(self.get_crossing_locations())
+        if not placed:
+            placed = self.try_locations(self.get_possible_locations())
+        return placed
+
+    def try_locations(self, untried_locations):
+        """draw the word at the first of the encoded locations where it fits.  Returns
+        True if successful, otherwise the word is left unplaced"""
+        grid_x_size = self.puzzle.grid.get_grid_size()[0]
 
         #Try each location in turn until the word fits
-        placed = False
-        while untried_locations <> [] and not placed:
-            current_location = untried_locations.pop()
-            x, y = current_location['coordinates']
+        for location in untried_locations:
+            x, y, x_dir, y_dir = decode_location(location, grid_x_size)
             self.set_coordinates(x, y)
-            x_dir, y_dir = current_location['direction']
             self.set_direction(x_dir, y_dir)
             if self.test_draw():
-                placed = True
                 self.draw()
-                #if a hidden message is to be displayed, re-draw it
-                if not self.puzzle.grid.random_padding:
-                    self.puzzle.grid.add_padding()
-
-        #Return the result of the attempted placement
-        return placed
+                return True
+        self.clear()
+        return False
+
+    def get_crossing_locations(self):
+        """return the encoded locations, in a random order, where the word would share at
+        least one letter with words already in the grid"""
+        if self.puzzle.is_large():
+            return self.sample_crossing_locations()
+        grid = self.puzzle.grid
+        grid_x_size, grid_y_size = grid.get_grid_size()
+        last_letter = self.get_length() - 1
+        crossing_locations = set()
+        for position, letter in enumerate(self.get_word_alpha()):
+            for cell in grid.get_letter_cells(letter):
+                cell_x = cell % grid_x_size
+                cell_y = cell // grid_x_size
+                for direction_id, (x_dir, y_dir) in enumerate(ALL_DIRECTIONS):
+                    #Work out where the word would start and end
+                    x = cell_x - x_dir * position
+                    y = cell_y - y_dir * position
+                    end_x = x + x_dir * last_letter
+                    end_y = y + y_dir * last_letter
+                    if (0 <= x < grid_x_size and 0 <= y < grid_y_size
+                            and 0 <= end_x < grid_x_size and 0 <= end_y < grid_y_size):
+                        crossing_locations.add(encode_location(x, y, direction_id, grid_x_size))
+        crossing_locations = list(crossing_locations)
+        self.puzzle.random.shuffle(crossing_locations)
+        #Tried from the end, as they always have been, so each seed gives the same grid as before
+        return reversed(crossing_locations)
+
+    def sample_crossing_locations(self):
+        """return some of the locations where the word would cross a matching letter,
+        found by looking at LARGE_CROSSING_PROBES random cells.  Used in large puzzle
+        mode, where finding every crossing would mean looking at every letter in the grid"""
+        grid = self.puzzle.grid
+        grid_x_size, grid_y_size = grid.get_grid_size()
+        cells = grid.cells
+        cell_count = len(cells)
+        random_number = self.puzzle.random.random
+        last_letter = self.get_length() - 1
+        positions = {}
+        for position, letter in enumerate(bytearray(self.get_word_alpha())):
+            positions.setdefault(letter, []).append(position)
+        crossing_locations = []
+        for probe in range(0, LARGE_CROSSING_PROBES):
+            cell = int(random_number() * cell_count)
+            letter = cells[cell]
+            if letter == BLANK_CODE or letter not in positions:
+                continue
+            cell_x = cell % grid_x_size
+            cell_y = cell // grid_x_size
+            for position in positions[letter]:
+                for direction_id, (x_dir, y_dir) in enumerate(ALL_DIRECTIONS):
+                    x = cell_x - x_dir * position
+                    y = cell_y - y_dir * position
+                    end_x = x + x_dir * last_letter
+                    end_y = y + y_dir * last_letter
+                    if (0 <= x < grid_x_size and 0 <= y < grid_y_size
+                            and 0 <= end_x < grid_x_size and 0 <= end_y < grid_y_size):
+                        crossing_locations.append(encode_location(x, y, direction_id, grid_x_size))
+        return crossing_locations
 
     def get_possible_locations(self):
-        """return a list of possible locations and directions where the word would
-        fit if the grid were empty"""
-        all_directions = ([-1, -1], [-1, 0], [-1, 1], [0, -1], [0, 1], [1, -1], [1, 0], [1, 1])
-        untried_locations = []
+        """return the encoded locations (see ftw.locations), in a random order, where the
+        word would fit if the grid were empty.  In large puzzle mode they're worked out
+        as they're tried rather than all at once"""
         grid_x_size, grid_y_size = self.puzzle.grid.get_grid_size()
-        word_length = self.get_length()
-        for direction in all_directions:
-            #Find the cells in the grid where the word could fit
-            x_start = max(0, -direction[0] * word_length - 1)
-            y_start = max(0, -direction[1] * word_length - 1)
-            x_end = min(grid_x_size - 1, grid_x_size - direction[0] * word_length)
-            y_end = min(grid_y_size - 1, grid_y_size - direction[1] * word_length)
-
-            #Build up the list of untried locations
-            for x in range(x_start, x_end + 1):
-                for y in range(y_start, y_end + 1):
-                    untried_locations.append({'coordinates': [x, y], 'direction': direction})
-        random.shuffle(untried_locations)
-        return untried_locations
-
-    def update(self, new_word, new_clue):
-        """Change the word and / or description"""
-        sucess = True
+        if self.puzzle.is_large():
+            return iter_random_locations(grid_x_size, grid_y_size, self.get_length(), self.puzzle.random)
+        untried_locations = get_locations(grid_x_size, grid_y_size, self.get_length()).tolist()
+        self.puzzle.random.shuffle(untried_locations)
+        return reversed(untried_locations)
+
+    def update(self, new_word, new_clue, rebuild = True):
+        """Change the word and / or description.  If rebuild is False and the word itself
+        has changed, the grid is left for the caller to regenerate with
+        Puzzle.resize_and_rebuild() and None is returned"""
+        success = True
         if new_clue:
             self.clue = new_clue
         if new_word <> self.get_word():
@@ -110,7 +187,11 @@ class Word(object):
             if not new_clue:
                 self.clue = new_word
             self.clear()
-            success = self.puzzle.resize_and_rebuild()
+            if rebuild:
+                success = self.puzzle.resize_and_rebuild()
+            else:
+                self.puzzle.measure_words()
+                success = None
         return success
 
     def get_word_alpha(self):
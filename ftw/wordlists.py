@@ -0,0 +1,53 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+
+
+def find_wordlists(paths):
+    """Returns the wordlist files named by paths, looking inside directories"""
+    wordlists = []
+    for path in paths:
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                full_name = os.path.join(path, filename)
+                if not filename.startswith('.') and os.path.isfile(full_name):
+                    wordlists.append(full_name)
+        else:
+            wordlists.append(path)
+    return wordlists
+
+
+def read_wordlist(filename):
+    """Returns a list of (word, clue) pairs read from a wordlist file.  The clue is
+    None if the line has no clue"""
+    wordlist = []
+    wordlist_file = open(filename, 'r')
+    for line in wordlist_file:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '\t' in line:
+            word, clue = line.split('\t', 1)
+            wordlist.append((word.strip(), clue.strip() or None))
+        else:
+            wordlist.append((line, None))
+    wordlist_file.close()
+    return wordlist
@@ -0,0 +1,121 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import multiprocessing
+import Queue
+
+from ftw import fileformat
+
+#Operations a GenerationWorker can run: the names of Puzzle methods
+POPULATE = "populate_grid"
+RESIZE = "resize_grid"
+REBUILD = "resize_and_rebuild"
+
+
+def run_generation(puzzle_data, operation, messages):
+    """Run operation on an encoded copy of a puzzle and send the progress and result to
+    the messages queue.  This runs in a worker process, so all errors are caught and
+    reported"""
+    try:
+        puzzle = fileformat.loads(puzzle_data)
+        puzzle.progress = lambda attempt, grid_size: messages.put(('progress', attempt, grid_size))
+        placed = getattr(puzzle, operation)()
+        messages.put(('done', {'placed': bool(placed),
+                               'grid_size': tuple(puzzle.grid.get_grid_size()),
+                               'force_size': (puzzle.force_x, puzzle.force_y),
+                               'placements': puzzle.get_placements(),
+                               'proven_unsolvable': puzzle.proven_unsolvable,
+                               'size_probes': puzzle.size_probes}))
+    except Exception, error:
+        messages.put(('error', "%s: %s" % (error.__class__.__name__, error)))
+
+
+class GenerationWorker(object):
+    """Runs a slow Puzzle operation in another process, so the caller can carry on and
+    check back with poll().  The worker has its own copy of the puzzle; the result is
+    only copied into the real puzzle by apply().  The puzzle's words mustn't change in
+    the meantime"""
+
+    def __init__(self, puzzle, operation):
+        self.puzzle = puzzle
+        self.operation = operation
+        self.messages = multiprocessing.Queue()
+        self.process = None
+        self.attempt = 0
+        self.grid_size = tuple(puzzle.grid.get_grid_size())
+        self.result = None
+        self.error = None
+
+    def start(self):
+        self.process = multiprocessing.Process(target = run_generation,
+                                               args = (fileformat.dumps(self.puzzle), self.operation, self.messages))
+        self.process.daemon = True
+        self.process.start()
+
+    def poll(self):
+        """Read any messages from the worker.  Returns True once it has finished"""
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except Queue.Empty:
+                break
+            if message[0] == 'progress':
+                self.attempt, self.grid_size = message[1:]
+            elif message[0] == 'done':
+                self.result = message[1]
+            else:
+                self.error = message[1]
+        if self.result is None and self.error is None and not self.process.is_alive():
+            #The process died without a word; check for a final message first
+            try:
+                message = self.messages.get(timeout = 0.1)
+                if message[0] == 'done':
+                    self.result = message[1]
+                elif message[0] == 'error':
+                    self.error = message[1]
+            except Queue.Empty:
+                pass
+            if self.result is None and self.error is None:
+                self.error = "the generation process stopped unexpectedly"
+        finished = self.result is not None or self.error is not None
+        if finished:
+            self.process.join()
+        return finished
+
+    def cancel(self):
+        """Stop the worker.  The puzzle is left as it was"""
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def apply(self):
+        """Copy the worker's result into the puzzle in one step.  Returns True if all the
+        words were placed"""
+        if self.result is None:
+            return False
+        puzzle = self.puzzle
+        puzzle.measure_words()
+        puzzle.grid.set_grid_size(*self.result['grid_size'])
+        puzzle.force_x, puzzle.force_y = self.result['force_size']
+        puzzle.set_placements(self.result['placements'])
+        puzzle.proven_unsolvable = self.result['proven_unsolvable']
+        puzzle.size_probes = self.result['size_probes']
+        return self.result['placed']
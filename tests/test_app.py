@@ -0,0 +1,118 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import unittest
+
+#The application needs GTK, so these tests are skipped where it isn't installed
+try:
+    import cairo
+    import gtk
+    import findthatword
+except ImportError:
+    findthatword = None
+
+
+class FakeWindow(object):
+
+    def __init__(self, size_x, size_y):
+        self.surface = cairo.ImageSurface(cairo.FORMAT_RGB24, size_x, size_y)
+
+    def cairo_create(self):
+        return cairo.Context(self.surface)
+
+    def get_size(self):
+        return self.surface.get_width(), self.surface.get_height()
+
+
+class FakeWidget(object):
+
+    def __init__(self, window):
+        self.window = window
+
+
+class FakeWidgetTree(object):
+
+    def __init__(self, widgets):
+        self.widgets = widgets
+
+    def get_widget(self, name):
+        return self.widgets[name]
+
+
+class FakeSelection(object):
+
+    def get_selected(self):
+        return None, None
+
+
+@unittest.skipIf(findthatword is None, "GTK is not installed")
+class AppTest(unittest.TestCase):
+
+    def make_app(self):
+        """Returns the application without its window, which isn't needed here"""
+        app = findthatword.FindThatWord.__new__(findthatword.FindThatWord)
+        app.show_title = app.show_grid = app.show_words = app.show_solution = True
+        app.preview_surface = None
+        app.preview_key = None
+        app.preview_revision = 0
+        window = FakeWindow(200, 300)
+        app.widget_tree = FakeWidgetTree({"ResultsAreaCairo": FakeWidget(window)})
+        app.words_view_widget_selection = FakeSelection()
+        return app
+
+    def test_preview_cached(self):
+        app = self.make_app()
+        renders = []
+        app.render_preview = lambda surface, size_x, size_y: renders.append((size_x, size_y))
+        app.draw_as_widget()
+        app.draw_as_widget()
+        self.assertEqual(renders, [(200, 300)])
+        app.invalidate_preview()
+        app.draw_as_widget()
+        self.assertEqual(len(renders), 2)
+        app.show_solution = False
+        app.draw_as_widget()
+        self.assertEqual(len(renders), 3)
+
+    def test_changes_applied_together(self):
+        app = self.make_app()
+        app.pending_changes = set()
+        app.pending_source = None
+        app.generation_worker = None
+        app.puzzle = findthatword.Puzzle()
+        redraws = []
+        generations = []
+        app.update_results_widget = lambda: redraws.append(True)
+        app.start_generation = generations.append
+        for change in ("redraw", "padding", "redraw", "resize"):
+            app.schedule_update(change)
+        self.assertEqual(redraws, [])
+        self.assertFalse(app.apply_pending_changes())
+        self.assertEqual(redraws, [True])
+        self.assertEqual(generations, [findthatword.RESIZE])
+        self.assertEqual(app.pending_changes, set())
+        self.assertEqual(app.pending_source, None)
+        #Nothing more happens until there's another change
+        app.apply_pending_changes()
+        self.assertEqual(redraws, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
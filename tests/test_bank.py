@@ -0,0 +1,68 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ftw.bank import PuzzleBank, PuzzleBankWriter
+from ftw.puzzle import Puzzle
+
+
+class BankTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "test.ftwb")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_puzzle(self, seed, words):
+        puzzle = Puzzle()
+        puzzle.set_seed(seed)
+        puzzle.add_words([(word, None) for word in words.split()])
+        return puzzle
+
+    def test_torn_record_dropped(self):
+        writer = PuzzleBankWriter(self.filename)
+        for seed in range(0, 3):
+            writer.append(self.make_puzzle(seed, "apple banana cherry"))
+        #Writing stops part way through the last record, without an index
+        writer.bank_file.truncate(writer.bank_file.tell() - 10)
+        writer.bank_file.close()
+
+        bank = PuzzleBank(self.filename)
+        self.assertEqual(len(bank), 2)
+        bank.close()
+
+        writer = PuzzleBankWriter(self.filename)
+        writer.append(self.make_puzzle(9, "kiwi lemon"))
+        writer.close()
+        bank = PuzzleBank(self.filename)
+        self.assertEqual([record.get_wordlist()[0][0] for record in bank], ["apple", "apple", "kiwi"])
+        for record in bank:
+            self.assertFalse("\0" in record.get_cells()[1])
+        bank.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import shutil
+import StringIO
+import sys
+import tempfile
+import unittest
+
+from ftw import batch, fileformat
+from ftw.wordlists import find_wordlists, read_wordlist
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.wordlists = os.path.join(self.directory, "wordlists")
+        self.output = os.path.join(self.directory, "output")
+        os.mkdir(self.wordlists)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_wordlist(self, name, text):
+        filename = os.path.join(self.wordlists, name)
+        wordlist_file = open(filename, 'w')
+        wordlist_file.write(text)
+        wordlist_file.close()
+        return filename
+
+    def run_main(self, argv):
+        stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        try:
+            return batch.main(argv), sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+    def test_read_wordlist(self):
+        filename = self.write_wordlist("animals", "# Animals\n\ncat\ndog\tMan's best friend\n  horse \t \n")
+        self.assertEqual(read_wordlist(filename), [("cat", None), ("dog", "Man's best friend"), ("horse", None)])
+        self.write_wordlist(".hidden", "cat\n")
+        self.assertEqual(find_wordlists([self.wordlists]), [filename])
+
+    def test_main(self):
+        self.write_wordlist("animals", "cat\ndog\nhorse\n")
+        self.write_wordlist("fruit", "apple\npear\nplum\n")
+        self.write_wordlist("long", "hippopotamus\n")
+        summary = os.path.join(self.directory, "summary.txt")
+        status, output = self.run_main(["-j", "2", "-s", "6x6", "--seed", "3", "-o", self.output,
+                                        "--summary", summary, self.wordlists])
+        self.assertEqual(status, 1)
+        self.assertTrue("3 puzzles: 2 succeeded, 1 failed" in output, output)
+        self.assertEqual(sorted(os.listdir(self.output)), ["animals.ftw", "animals.txt", "fruit.ftw", "fruit.txt"])
+        puzzle = fileformat.load(os.path.join(self.output, "fruit.ftw"))
+        self.assertEqual(puzzle.get_seed(), 3)
+        self.assertTrue(puzzle.get_result())
+        lines = open(summary).read().splitlines()
+        self.assertEqual(len(lines), 4)
+        failed = [line.split("\t") for line in lines[1:] if line.startswith("long\t")][0]
+        self.assertEqual(failed[2], "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
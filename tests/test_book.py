@@ -0,0 +1,69 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ftw import book, fileformat, puzzle
+from ftw.batch import build_puzzle
+
+
+class BookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_file(self, filename, text):
+        filename = os.path.join(self.directory, filename)
+        output = open(filename, 'w')
+        output.write(text)
+        output.close()
+        return filename
+
+    def test_read_puzzles(self):
+        saved = build_puzzle("saved", [("cat", None), ("dog", None)], seed = 1)[0]
+        fileformat.save(saved, os.path.join(self.directory, "a.ftw"))
+        self.write_file("b.txt", "apple\npear\n")
+        puzzles = list(book.read_puzzles([self.directory], seed = 2))
+        self.assertEqual([each.get_title() for each in puzzles], ["saved", "b"])
+        self.assertEqual(puzzles[0].get_placements(), saved.get_placements())
+
+    def test_failed_wordlist_left_out(self):
+        wordlist = self.write_file("c.txt", "apple\npear\n")
+        failures = []
+        max_size_probes = puzzle.DEFAULT_MAX_SIZE_PROBES
+        puzzle.DEFAULT_MAX_SIZE_PROBES = 0
+        try:
+            puzzles = list(book.read_puzzles([wordlist], failures = failures))
+        finally:
+            puzzle.DEFAULT_MAX_SIZE_PROBES = max_size_probes
+        self.assertEqual(puzzles, [])
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0][0], wordlist)
+        self.assertFalse(failures[0][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import unittest
+
+from ftw.cache import GenerationCache
+from ftw.puzzle import Puzzle
+
+
+class CacheTest(unittest.TestCase):
+
+    def make_puzzle(self):
+        puzzle = Puzzle()
+        puzzle.set_seed(3)
+        for word in "cat dog bird".split():
+            puzzle.add_word(word, None, False)
+        return puzzle
+
+    def test_key_covers_search_limits(self):
+        cache = GenerationCache()
+        key = cache.get_key(self.make_puzzle())
+        puzzle = self.make_puzzle()
+        puzzle.max_size_probes -= 1
+        self.assertNotEqual(cache.get_key(puzzle), key)
+        puzzle = self.make_puzzle()
+        puzzle.max_solver_steps -= 1
+        self.assertNotEqual(cache.get_key(puzzle), key)
+        self.assertEqual(cache.get_key(self.make_puzzle()), key)
+
+
+if __name__ == "__main__":
+    unittest.main()
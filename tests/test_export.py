@@ -0,0 +1,107 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import shutil
+import StringIO
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from ftw import export, fileformat
+from ftw.bank import BANK_EXT, PuzzleBankWriter
+from ftw.batch import build_puzzle
+
+#Prints the drawing modules loaded by the headless parts of the package
+HEADLESS_IMPORTS = """
+import sys
+import ftw.batch, ftw.book, ftw.export, ftw.puzzle, ftw.worker
+print(" ".join(sorted(name for name in ("cairo", "gtk", "pango", "pangocairo", "ftw.render")
+                      if name in sys.modules)))
+"""
+
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_headless_imports(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.Popen([sys.executable, "-c", HEADLESS_IMPORTS], cwd = root,
+                                   stdout = subprocess.PIPE)
+        output = process.communicate()[0]
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(output.strip(), "")
+
+    def test_write_text(self):
+        puzzle = build_puzzle("animals", [("cat", None), ("dog", None)], seed = 1)[0]
+        filename = os.path.join(self.directory, "animals.txt")
+        export.write_text(puzzle, filename)
+        text = open(filename).read()
+        self.assertEqual(text, puzzle.draw_as_text(False, True, True, True))
+        lines = text.splitlines()
+        size_x, size_y = puzzle.grid.get_grid_size()
+        self.assertEqual(lines[0], "animals")
+        self.assertEqual([len(line.split()) for line in lines[3:3 + size_y]], [size_x] * size_y)
+        self.assertEqual(lines[-2:], ["cat", "dog"])
+
+    def test_export_puzzles(self):
+        puzzles = [(name, build_puzzle(name, [(word, None) for word in words.split()], seed = 1)[0])
+                   for name, words in (("animals", "cat dog horse"), ("fruit", "apple pear plum"))]
+        stats = export.export_puzzles(iter(puzzles), self.directory, ['txt', 'ftw'], processes = 2)
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ["animals.ftw", "animals.txt", "fruit.ftw", "fruit.txt"])
+        self.assertEqual(fileformat.load(os.path.join(self.directory, "fruit.ftw")).get_placements(),
+                         puzzles[1][1].get_placements())
+        self.assertEqual((stats['puzzles'], stats['files'], stats['errors']), (2, 4, []))
+        self.assertEqual(sorted(stats['format_seconds']), ['ftw', 'txt'])
+        lines = export.format_export_stats(stats)
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("2 puzzles, 4 files in "), lines[0])
+        self.assertTrue(lines[1].startswith("  ftw "), lines[1])
+        self.assertTrue(lines[2].startswith("  txt "), lines[2])
+
+    def test_main(self):
+        saved = build_puzzle("animals", [("cat", None), ("dog", None)], seed = 1)[0]
+        fileformat.save(saved, os.path.join(self.directory, "animals.ftw"))
+        writer = PuzzleBankWriter(os.path.join(self.directory, "fruit." + BANK_EXT))
+        for seed in range(0, 2):
+            writer.append(build_puzzle("fruit", [("apple", None), ("pear", None)], seed = seed)[0])
+        writer.close()
+        output_dir = os.path.join(self.directory, "output")
+        stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        try:
+            status = export.main(["-j", "1", "-f", "txt", "-o", output_dir, self.directory])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted(os.listdir(output_dir)), ["animals.txt", "fruit-00000.txt", "fruit-00001.txt"])
+        self.assertTrue(output.startswith("3 puzzles, 3 files in "), output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import cPickle
+import unittest
+
+from ftw import fileformat
+from ftw.batch import build_puzzle
+
+
+class FileFormatTest(unittest.TestCase):
+
+    def make_puzzle(self):
+        puzzle = build_puzzle("fruit", [("apple", "Red or green"), ("pear", None), ("plum", "Purple")],
+                              seed = 4)[0]
+        puzzle.set_narrative("Found in an orchard")
+        return puzzle
+
+    def assertSamePuzzle(self, loaded, puzzle):
+        self.assertEqual(loaded.get_title(), puzzle.get_title())
+        self.assertEqual(loaded.get_narrative(), puzzle.get_narrative())
+        self.assertEqual([(word.get_word(), word.get_clue()) for word in loaded.get_wordlist()],
+                         [(word.get_word(), word.get_clue()) for word in puzzle.get_wordlist()])
+        self.assertEqual(loaded.get_placements(), puzzle.get_placements())
+        self.assertEqual(loaded.grid.get_grid_size(), puzzle.grid.get_grid_size())
+        x_size, y_size = puzzle.grid.get_grid_size()
+        for result_type in ("words", "both"):
+            self.assertEqual([loaded.grid.get_row(y, result_type) for y in range(0, y_size)],
+                             [puzzle.grid.get_row(y, result_type) for y in range(0, y_size)])
+        self.assertEqual(loaded.grid.letter_cells, puzzle.grid.letter_cells)
+        self.assertEqual(loaded.grid.line_cells, puzzle.grid.line_cells)
+
+    def test_round_trip(self):
+        puzzle = self.make_puzzle()
+        puzzle.use_solver = True
+        puzzle.max_size_probes = 7
+        data = fileformat.dumps(puzzle)
+        loaded = fileformat.loads(data)
+        self.assertSamePuzzle(loaded, puzzle)
+        self.assertEqual(loaded.get_seed(), 4)
+        self.assertTrue(loaded.use_solver)
+        self.assertEqual(loaded.max_size_probes, 7)
+        self.assertEqual(fileformat.dumps(loaded), data)
+        record = fileformat.PuzzleRecord(data)
+        self.assertEqual(record.get_title(), "fruit")
+        self.assertEqual(record.get_word_count(), 3)
+
+    def test_old_pickle(self):
+        puzzle = self.make_puzzle()
+        old = self.make_puzzle()
+        grid = old.grid
+        x_size, y_size = grid.get_grid_size()
+        grid.array = [[grid.get_cell(x, y) for y in range(0, y_size)] for x in range(0, x_size)]
+        grid.array_padding = [[grid.get_cell(x, y, "padding") for y in range(0, y_size)]
+                              for x in range(0, x_size)]
+        for name in ("cells", "padding_cells", "blank_cells", "letter_cells", "line_cells",
+                     "width", "padding_dirty"):
+            delattr(grid, name)
+        for name in ("random", "seed", "max_size_probes", "size_probes", "use_solver"):
+            delattr(old, name)
+        loaded = fileformat.loads(cPickle.dumps(old, 2))
+        self.assertSamePuzzle(loaded, puzzle)
+        self.assertFalse(loaded.use_solver)
+
+    def test_not_a_puzzle(self):
+        self.assertRaises(fileformat.FileFormatError, fileformat.PuzzleRecord, "not a puzzle")
+
+
+if __name__ == "__main__":
+    unittest.main()
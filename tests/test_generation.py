@@ -0,0 +1,118 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import random
+import StringIO
+import time
+import unittest
+
+from ftw.puzzle import Puzzle
+
+
+def make_words(count, seed = 0):
+    """Returns count made up words of four to nine letters"""
+    word_random = random.Random(seed)
+    return ["".join([word_random.choice("abcdefghij") for letter in range(0, word_random.randint(4, 9))])
+            for word in range(0, count)]
+
+
+class GenerationTest(unittest.TestCase):
+
+    def make_puzzle(self, words, size = None, seed = 1):
+        puzzle = Puzzle()
+        puzzle.set_seed(seed)
+        if size:
+            puzzle.set_is_forced_size(True)
+            puzzle.force_x = puzzle.force_y = size
+        puzzle.add_words([(word, None) for word in words], False)
+        return puzzle
+
+    def test_time_budget_inside_attempt(self):
+        puzzle = self.make_puzzle(make_words(2000), 100)
+        result = puzzle.generate_grid(0.1)
+        self.assertTrue(result.out_of_budget)
+        self.assertTrue(result.seconds < 1.0, result)
+        self.assertEqual(result.attempts, 1)
+        self.assertEqual(puzzle.get_result().placed_words, result.placed_words)
+
+    def test_attempt_limit(self):
+        puzzle = self.make_puzzle("aa bb cc dd ee".split(), 2)
+        result = puzzle.generate_grid(None, 3)
+        self.assertFalse(result)
+        self.assertTrue(result.out_of_budget)
+        self.assertEqual(result.attempts, 3)
+
+    def search_sizes(self, max_size_probes):
+        """Searches for a grid size from 5, where only sizes from 13 up fit.  Returns
+        the size chosen and the sizes tried"""
+        puzzle = self.make_puzzle(make_words(10))
+        puzzle.max_size_probes = max_size_probes
+        puzzle.size_probes = 0
+        sizes = []
+        def fits_from_13():
+            puzzle.size_probes += 1
+            sizes.append(puzzle.grid.get_grid_size()[0])
+            return sizes[-1] >= 13
+        puzzle.place_all_words = fits_from_13
+        puzzle.grid.set_grid_size(5, 5)
+        self.assertTrue(puzzle.search_grid_size())
+        return puzzle.grid.get_grid_size()[0], sizes
+
+    def test_size_search(self):
+        size, sizes = self.search_sizes(20)
+        self.assertEqual(size, 13)
+        self.assertEqual(sizes, [5, 6, 8, 12, 20, 16, 14, 13])
+        #Out of probes, the smallest size found to fit is kept
+        size, sizes = self.search_sizes(6)
+        self.assertEqual(size, 16)
+        self.assertEqual(len(sizes), 6)
+
+    def generate(self, seed):
+        """Returns the placements and padded rows of a puzzle generated from seed"""
+        puzzle = self.make_puzzle(make_words(15, 2), seed = seed)
+        self.assertTrue(puzzle.generate_grid())
+        x_size, y_size = puzzle.grid.get_grid_size()
+        return puzzle.get_placements(), [puzzle.grid.get_row(y, "both") for y in range(0, y_size)]
+
+    def test_same_seed_same_grid(self):
+        random.seed(42)
+        state = random.getstate()
+        first = self.generate(7)
+        self.assertEqual(self.generate(7), first)
+        self.assertNotEqual(self.generate(8), first)
+        #The puzzles keep random generators of their own
+        self.assertEqual(random.getstate(), state)
+
+    def test_large_grid(self):
+        puzzle = self.make_puzzle(make_words(300, 3), 60)
+        self.assertTrue(puzzle.is_large())
+        start_time = time.time()
+        result = puzzle.generate_grid()
+        self.assertTrue(result, result)
+        self.assertTrue(time.time() - start_time < 10.0)
+        stream = StringIO.StringIO()
+        puzzle.write_text(stream, False, False, True, False)
+        rows = [line for line in stream.getvalue().splitlines() if line]
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(set([len(row.split()) for row in rows]), set([60]))
+
+
+if __name__ == "__main__":
+    unittest.main()
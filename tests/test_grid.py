@@ -0,0 +1,94 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import unittest
+
+from ftw.puzzle import Puzzle
+
+
+class GridTest(unittest.TestCase):
+
+    def make_puzzle(self):
+        puzzle = Puzzle()
+        puzzle.set_seed(0)
+        puzzle.add_words([(word, None) for word in "apple pear plum".split()])
+        return puzzle
+
+    def test_cells(self):
+        grid = self.make_puzzle().grid
+        grid.set_grid_size(3, 2)
+        grid.clear()
+        grid.set_cell(2, 1, 'x')
+        self.assertEqual(grid.get_cell(2, 1), 'x')
+        self.assertEqual(grid.get_row(1), "  x")
+        self.assertEqual(grid.cells, bytearray("     x"))
+        self.assertEqual(grid.get_letter_cells('x'), set([5]))
+        grid.set_cell(2, 1, ' ')
+        self.assertEqual(grid.get_letter_cells('x'), set())
+
+    def test_snapshot_restore(self):
+        puzzle = self.make_puzzle()
+        grid = puzzle.grid
+        placements = puzzle.get_placements()
+        snapshot = grid.snapshot()
+        cells = bytes(grid.cells)
+        line_cells = bytes(grid.line_cells)
+        for size in (grid.get_grid_size()[0], grid.get_grid_size()[0] + 3):
+            puzzle.clear_wordlist()
+            grid.set_grid_size(size, size)
+            grid.clear()
+            grid.set_cell(0, 0, 'z')
+            puzzle.set_placements(placements, snapshot)
+            self.assertEqual(bytes(grid.cells), cells)
+            self.assertEqual(bytes(grid.line_cells), line_cells)
+            self.assertEqual(grid.get_letter_cells('z'), ())
+            letter_cells = dict(grid.letter_cells)
+            grid.index_letters()
+            self.assertEqual(grid.letter_cells, letter_cells)
+
+    def test_hidden_message(self):
+        grid = self.make_puzzle().grid
+        grid.random_padding = False
+        grid.padding = "secret"
+        grid.set_grid_size(3, 3)
+        grid.clear()
+        grid.set_cell(1, 0, 'x')
+        grid.set_cell(0, 1, 'y')
+        self.assertEqual([grid.get_row(y, "both") for y in range(3)], ["sxe", "ycr", "et "])
+        #Taking a letter out lets the message run through its cell
+        grid.set_cell(1, 0, ' ')
+        self.assertEqual([grid.get_row(y, "padding") for y in range(3)], ["sec", " re", "t  "])
+        self.assertEqual(grid.get_cell(1, 1, "both"), 'r')
+
+    def test_random_padding_follows_seed(self):
+        rows = []
+        for seed in (5, 5, 6):
+            grid = self.make_puzzle().grid
+            grid.puzzle.set_seed(seed)
+            grid.padding_dirty = True
+            x_size, y_size = grid.get_grid_size()
+            rows.append([grid.get_row(y, "padding") for y in range(y_size)])
+        self.assertEqual(rows[0], rows[1])
+        self.assertNotEqual(rows[0], rows[2])
+        self.assertFalse(' ' in "".join(rows[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import itertools
+import random
+import time
+import unittest
+
+from ftw.locations import ALL_DIRECTIONS, decode_location, encode_location, get_cover, get_locations, \
+     get_start_and_step, iter_random_locations
+
+
+class LocationsTest(unittest.TestCase):
+
+    def test_locations_fit(self):
+        for width, height, length in ((5, 5, 3), (7, 3, 4), (4, 6, 1), (3, 3, 4)):
+            expected = set()
+            for y in range(0, height):
+                for x in range(0, width):
+                    for direction_id, (x_dir, y_dir) in enumerate(ALL_DIRECTIONS):
+                        end_x = x + x_dir * (length - 1)
+                        end_y = y + y_dir * (length - 1)
+                        if 0 <= end_x < width and 0 <= end_y < height:
+                            expected.add(encode_location(x, y, direction_id, width))
+            locations = get_locations(width, height, length)
+            self.assertEqual(len(locations), len(expected))
+            self.assertEqual(set(locations), expected)
+
+    def test_locations_cached(self):
+        self.assertTrue(get_locations(9, 8, 5) is get_locations(9, 8, 5))
+        self.assertTrue(get_cover(9, 8, 5) is get_cover(9, 8, 5))
+
+    def test_decode(self):
+        location = encode_location(3, 2, ALL_DIRECTIONS.index((-1, 1)), 7)
+        self.assertEqual(decode_location(location, 7), (3, 2, -1, 1))
+        self.assertEqual(get_start_and_step(location, 7), (2 * 7 + 3, 7 - 1))
+
+    def test_cover(self):
+        width, height, length = 6, 4, 3
+        locations = get_locations(width, height, length)
+        cover = get_cover(width, height, length)
+        for cell, entries in enumerate(cover):
+            for code in entries:
+                location_id, position = divmod(code, length)
+                start, step = get_start_and_step(locations[location_id], width)
+                self.assertEqual(start + position * step, cell)
+        self.assertEqual(sum([len(entries) for entries in cover]), len(locations) * length)
+
+    def test_random_locations(self):
+        for width, height, length in ((5, 5, 3), (7, 3, 4), (4, 6, 1), (3, 3, 4)):
+            locations = list(iter_random_locations(width, height, length, random.Random(1)))
+            self.assertEqual(sorted(locations), sorted(get_locations(width, height, length)))
+        self.assertEqual(list(iter_random_locations(6, 6, 3, random.Random(2))),
+                         list(iter_random_locations(6, 6, 3, random.Random(2))))
+
+    def test_random_locations_lazy(self):
+        start_time = time.time()
+        locations = list(itertools.islice(iter_random_locations(5000, 5000, 10, random.Random(1)), 0, 10))
+        self.assertTrue(time.time() - start_time < 1.0)
+        self.assertEqual(len(set(locations)), 10)
+        for location in locations:
+            x, y, x_dir, y_dir = decode_location(location, 5000)
+            self.assertTrue(0 <= x + x_dir * 9 < 5000 and 0 <= y + y_dir * 9 < 5000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import unittest
+
+from ftw.parallel import KEEP_DENSEST, KEEP_SMALLEST, MultiStart
+from ftw.puzzle import Puzzle
+
+WORDS = "apple banana cherry damson elder fig grape lemon mango".split()
+
+
+class MultiStartTest(unittest.TestCase):
+
+    def make_puzzle(self, size):
+        puzzle = Puzzle()
+        puzzle.set_seed(1)
+        puzzle.set_is_forced_size(True)
+        puzzle.force_x = puzzle.force_y = size
+        puzzle.add_words([(word, None) for word in WORDS], False)
+        return puzzle
+
+    def test_result_of_success(self):
+        puzzle = self.make_puzzle(10)
+        result = MultiStart(puzzle, 2).populate_grid()
+        self.assertTrue(result)
+        self.assertEqual(result.placed_words, len(WORDS))
+        self.assertEqual(puzzle.get_result().placed_words, len(WORDS))
+
+    def test_keeps_partial_placement(self):
+        puzzle = self.make_puzzle(6)
+        result = MultiStart(puzzle, 2, max_attempts = 4).populate_grid()
+        self.assertFalse(result)
+        self.assertTrue(result.out_of_budget)
+        self.assertTrue(result.placed_words > 0)
+        self.assertEqual(puzzle.get_result().placed_words, result.placed_words)
+
+    def test_is_better(self):
+        small = {'grid_size': (8, 8), 'occupied': 30}
+        large_dense = {'grid_size': (9, 9), 'occupied': 60}
+        for keep, best in ((KEEP_SMALLEST, small), (KEEP_DENSEST, large_dense)):
+            multi_start = MultiStart(self.make_puzzle(10), 2, keep = keep)
+            for result in (small, large_dense):
+                if multi_start.is_better(result):
+                    multi_start.best = result
+            self.assertTrue(multi_start.best is best)
+
+    def test_keep_densest(self):
+        occupied = []
+        for seed in range(2, 10):
+            puzzle = self.make_puzzle(8)
+            puzzle.set_seed(seed)
+            puzzle.populate_grid()
+            occupied.append(len(puzzle.grid.cells) - puzzle.grid.cells.count(" "))
+        puzzle = self.make_puzzle(8)
+        puzzle.set_seed(2)
+        multi_start = MultiStart(puzzle, 2, max_attempts = 8, keep = KEEP_DENSEST)
+        self.assertTrue(multi_start.populate_grid())
+        self.assertEqual(multi_start.attempts, 8)
+        self.assertNotEqual(occupied[0], max(occupied))
+        self.assertEqual(len(puzzle.grid.cells) - puzzle.grid.cells.count(" "), max(occupied))
+        #The winning seed is kept, so the puzzle generates the same grid again
+        placements = puzzle.get_placements()
+        puzzle.populate_grid()
+        self.assertEqual(puzzle.get_placements(), placements)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import unittest
+
+from ftw.puzzle import Puzzle
+
+#Words that are easily hidden inside one another
+SUBSTRING_WORDS = "cat cats concatenate the other brother an and band husband".split()
+
+
+class PlacementTest(unittest.TestCase):
+
+    def make_puzzle(self, words, seed):
+        puzzle = Puzzle()
+        puzzle.set_seed(seed)
+        puzzle.add_words([(word, None) for word in words])
+        return puzzle
+
+    def test_no_word_hidden_inside_another(self):
+        for seed in range(0, 100):
+            puzzle = self.make_puzzle(SUBSTRING_WORDS, seed)
+            self.assertTrue(puzzle.get_result())
+            cells = [set(word.get_cells()) for word in puzzle.get_wordlist()]
+            for i, word_cells in enumerate(cells):
+                for j, other_cells in enumerate(cells):
+                    self.assertFalse(i != j and word_cells <= other_cells,
+                                     "seed %d: %s is inside %s" % (seed, SUBSTRING_WORDS[i], SUBSTRING_WORDS[j]))
+
+    def test_same_line_overlap_rejected(self):
+        puzzle = self.make_puzzle(["husband", "band"], 0)
+        husband, band = puzzle.get_wordlist()
+        x, y = husband.get_coordinates()
+        x_dir, y_dir = husband.get_direction()
+        #band along husband, in both directions along the line
+        band.set_coordinates(x + 3 * x_dir, y + 3 * y_dir)
+        band.set_direction(x_dir, y_dir)
+        self.assertFalse(band.test_draw())
+        band.set_coordinates(x + 6 * x_dir, y + 6 * y_dir)
+        band.set_direction(-x_dir, -y_dir)
+        self.assertFalse(band.test_draw())
+
+    def test_loaded_puzzle_keeps_lines(self):
+        from ftw import fileformat
+        puzzle = fileformat.loads(fileformat.dumps(self.make_puzzle(["husband", "band"], 0)))
+        husband, band = puzzle.get_wordlist()
+        x, y = husband.get_coordinates()
+        x_dir, y_dir = husband.get_direction()
+        band.set_coordinates(x + 3 * x_dir, y + 3 * y_dir)
+        band.set_direction(x_dir, y_dir)
+        self.assertFalse(band.test_draw())
+
+    def test_word_without_letters(self):
+        puzzle = Puzzle()
+        puzzle.set_seed(0)
+        self.assertTrue(puzzle.add_words([("cat", None), ("dog", None), ("123", None)]))
+        self.assertEqual(puzzle.grid.get_grid_size(), [5, 5])
+
+    def test_single_letter_not_hidden(self):
+        for seed in range(0, 20):
+            puzzle = self.make_puzzle(["a", "cat", "an"], seed)
+            self.assertTrue(puzzle.get_result())
+            a_cell = puzzle.get_wordlist()[0].get_cells()[0]
+            for word in puzzle.get_wordlist()[1:]:
+                self.assertFalse(a_cell in word.get_cells(), "seed %d" % seed)
+
+    def test_size_search_is_capped(self):
+        puzzle = self.make_puzzle(["cat", "dog"], 0)
+        puzzle.max_size_probes = 100
+        sizes = []
+        def never_fits():
+            puzzle.size_probes += 1
+            sizes.append(puzzle.grid.get_grid_size()[0])
+            return False
+        puzzle.place_all_words = never_fits
+        puzzle.grid.set_grid_size(5, 5)
+        self.assertFalse(puzzle.search_grid_size())
+        self.assertEqual(max(sizes), 3 + 6)
+        self.assertEqual(len(sizes), len(set(sizes)))
+
+    def test_failed_add_leaves_word_unplaced(self):
+        puzzle = Puzzle()
+        puzzle.set_seed(1)
+        puzzle.set_is_forced_size(True)
+        puzzle.force_x = puzzle.force_y = 5
+        puzzle.add_words([(word, None) for word in "abcde fghij klmno pqrst uvwxy".split()])
+        for row, word in enumerate(puzzle.get_wordlist()):
+            word.set_coordinates(0, row)
+            word.set_direction(1, 0)
+        puzzle.redraw_grid()
+        self.assertEqual(puzzle.add_word("zzzzz", None, False), None)
+        self.assertEqual(puzzle.get_wordlist()[-1].get_coordinates(), [None, None])
+        puzzle.redraw_grid()
+        self.assertEqual(puzzle.grid.get_row(4), "uvwxy")
+        self.assertEqual(puzzle.get_result().placed_words, 5)
+
+    def test_repair_keeps_words_apart(self):
+        puzzle = Puzzle()
+        puzzle.set_seed(0)
+        puzzle.set_is_forced_size(True)
+        puzzle.force_x, puzzle.force_y = 7, 1
+        puzzle.add_words([("husband", None)])
+        self.assertEqual(puzzle.add_word("band", None, False), None)
+        husband, band = puzzle.get_wordlist()
+        self.assertEqual(band.get_coordinates(), [None, None])
+        self.assertEqual(puzzle.grid.get_row(0), "husband")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import collections
+import unittest
+
+from ftw.puzzle import Puzzle
+
+#Rendering needs cairo and pango, so these tests are skipped where they aren't installed
+try:
+    import cairo
+    import pango
+    import pangocairo
+    from ftw import render
+except ImportError:
+    render = None
+
+
+class CountingContext(object):
+    """Wraps a cairo context, counting the calls made to each of its methods"""
+
+    def __init__(self, context):
+        self.context = context
+        self.calls = collections.defaultdict(int)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.context, name)
+        if not callable(attribute):
+            return attribute
+        def call(*args):
+            self.calls[name] += 1
+            return attribute(*args)
+        return call
+
+
+@unittest.skipIf(render is None, "cairo and pango are not installed")
+class RenderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.surface = cairo.ImageSurface(cairo.FORMAT_RGB24, 400, 400)
+
+    def make_puzzle(self):
+        puzzle = Puzzle()
+        puzzle.set_seed(2)
+        puzzle.add_words([(word, None) for word in "apple pear plum cherry".split()])
+        return puzzle
+
+    def draw_grid(self, puzzle, show_solution):
+        """Draws the grid, and returns the number of calls made to each context method"""
+        context = CountingContext(cairo.Context(self.surface))
+        render.draw_grid(puzzle.grid, context, 0, 0, 400, 400, show_solution, None, 40)
+        return context.calls
+
+    def test_glyph_centre_cached(self):
+        render._glyph_centres.clear()
+        context = CountingContext(cairo.Context(self.surface))
+        context.set_font_size(20)
+        centre = render.get_glyph_centre(context, 20, 'w')
+        self.assertEqual(render.get_glyph_centre(context, 20, 'w'), centre)
+        self.assertEqual(context.calls['text_extents'], 1)
+        self.assertEqual(len(render._glyph_centres), 1)
+        xbearing, ybearing, width, height, xadvance, yadvance = context.text_extents('w')
+        self.assertEqual(centre, float(width) / 2 + xbearing)
+
+    def test_letters_batched_by_colour(self):
+        puzzle = self.make_puzzle()
+        render._glyph_centres.clear()
+        calls = self.draw_grid(puzzle, True)
+        x_size, y_size = puzzle.grid.get_grid_size()
+        self.assertEqual(calls['show_text'], x_size * y_size)
+        #The background and grid colours, then one for each colour of letter
+        self.assertEqual(calls['set_source_rgb'], 4)
+        self.assertTrue(calls['text_extents'] <= 26)
+        #Drawn again, every letter is already measured
+        calls = self.draw_grid(puzzle, True)
+        self.assertEqual(calls['text_extents'], 0)
+
+    def test_lines_stroked_together(self):
+        puzzle = self.make_puzzle()
+        calls = self.draw_grid(puzzle, False)
+        self.assertEqual(calls['stroke'], 1)
+        #The solution lines are one more path
+        calls = self.draw_grid(puzzle, True)
+        self.assertEqual(calls['stroke'], 2)
+        #and the selected word another
+        context = CountingContext(cairo.Context(self.surface))
+        render.draw_grid(puzzle.grid, context, 0, 0, 400, 400, True, puzzle.get_word(0), 40)
+        self.assertEqual(context.calls['stroke'], 3)
+        self.assertEqual(context.calls['set_source_rgba'], 2)
+
+    def make_layout(self):
+        layout = pangocairo.CairoContext(cairo.Context(self.surface)).create_layout()
+        return layout, pango.FontDescription("Sans 40")
+
+    def test_fit_font_size(self):
+        layout, font_description = self.make_layout()
+        render.fit_font_size(layout, font_description, cairo.ImageSurface, 30, 400)
+        size = font_description.get_size()
+        height = render.get_line_height(layout, font_description, cairo.ImageSurface)
+        self.assertTrue(30 * height <= 400)
+        font_description.set_size(size + 1)
+        height = render.get_line_height(layout, font_description, cairo.ImageSurface)
+        self.assertTrue(30 * height > 400)
+
+    def test_font_size_kept_when_it_fits(self):
+        layout, font_description = self.make_layout()
+        size = font_description.get_size()
+        render.fit_font_size(layout, font_description, cairo.ImageSurface, 2, 400)
+        self.assertEqual(font_description.get_size(), size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import random
+import unittest
+
+from ftw.locations import DIRECTION_MASK, get_line_bits, get_locations, get_start_and_step
+from ftw.puzzle import Puzzle
+from ftw.solver import Solver
+
+
+def fits_anywhere(words, size):
+    """Returns True if the words can all be placed in a size x size grid, found by
+    trying every combination of locations"""
+    locations = []
+    for word in words:
+        word_locations = []
+        for location in get_locations(size, size, len(word)):
+            start, step = get_start_and_step(location, size)
+            line_bits = get_line_bits(location & DIRECTION_MASK, len(word))
+            word_locations.append([(start + position * step, letter, line_bits)
+                                   for position, letter in enumerate(word)])
+        locations.append(word_locations)
+    def place(word_id, cells):
+        if word_id == len(words):
+            return True
+        for word_cells in locations[word_id]:
+            for cell, letter, line_bits in word_cells:
+                if cell in cells and (cells[cell][0] != letter or cells[cell][1] & line_bits):
+                    break
+            else:
+                added = dict(cells)
+                for cell, letter, line_bits in word_cells:
+                    added[cell] = (letter, added.get(cell, (letter, 0))[1] | line_bits)
+                if place(word_id + 1, added):
+                    return True
+        return False
+    return place(0, {})
+
+
+class SolverTest(unittest.TestCase):
+
+    def make_puzzle(self, words, size, seed = 0):
+        puzzle = Puzzle()
+        puzzle.set_seed(seed)
+        puzzle.set_is_forced_size(True)
+        puzzle.force_x = puzzle.force_y = size
+        puzzle.add_words([(word, None) for word in words])
+        return puzzle
+
+    def test_no_word_hidden_inside_another(self):
+        words = "cat cats concatenate the other brother an and band husband".split()
+        for seed in range(0, 10):
+            puzzle = self.make_puzzle(words, 12, seed)
+            self.assertTrue(Solver(puzzle).solve())
+            cells = [set(word.get_cells()) for word in puzzle.get_wordlist()]
+            for i, word_cells in enumerate(cells):
+                for j, other_cells in enumerate(cells):
+                    self.assertFalse(i != j and word_cells <= other_cells)
+
+    def test_keeps_partial_placement(self):
+        puzzle = self.make_puzzle("aa bb cc dd ee".split(), 2)
+        solver = Solver(puzzle)
+        self.assertFalse(solver.solve())
+        self.assertTrue(solver.exhausted)
+        self.assertEqual(solver.placed_words, 2)
+        self.assertEqual(puzzle.get_result().placed_words, 2)
+
+    def test_order_independent(self):
+        #ab down the first column, then aa and bb across the rows
+        puzzle = self.make_puzzle(["bb", "aa", "ab"], 2)
+        for seed in range(0, 5):
+            puzzle.set_seed(seed)
+            self.assertTrue(Solver(puzzle).solve())
+
+    def test_matches_exhaustive_search(self):
+        instance_random = random.Random(0)
+        for instance in range(0, 300):
+            size = instance_random.choice((2, 3))
+            words = ["".join([instance_random.choice("ab") for letter in range(0, instance_random.randint(1, size))])
+                     for word in range(0, instance_random.randint(2, size + 2))]
+            puzzle = self.make_puzzle(words, size, instance)
+            solver = Solver(puzzle)
+            placed = solver.solve()
+            self.assertEqual(bool(placed), fits_anywhere(words, size), "%r in %dx%d" % (words, size, size))
+            self.assertEqual(solver.exhausted, not placed)
+
+
+if __name__ == "__main__":
+    unittest.main()
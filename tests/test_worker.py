@@ -0,0 +1,68 @@
+"""
+Copyright 2009 Jonny Jones and Ieuan Jones
+
+    This file is part of FindThatWord.
+
+    FindThatWord is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import time
+import unittest
+
+from ftw import fileformat
+from ftw.puzzle import Puzzle
+from ftw.worker import GenerationWorker, POPULATE
+
+
+class WorkerTest(unittest.TestCase):
+
+    def make_puzzle(self, words, seed = 3):
+        puzzle = Puzzle()
+        puzzle.set_seed(seed)
+        puzzle.add_words([(word, None) for word in words], False)
+        return puzzle
+
+    def wait(self, worker):
+        timeout = time.time() + 60
+        while not worker.poll():
+            self.assertTrue(time.time() < timeout, "the worker didn't finish")
+            time.sleep(0.01)
+
+    def test_populate(self):
+        puzzle = self.make_puzzle("apple pear plum cherry damson quince".split())
+        expected = fileformat.loads(fileformat.dumps(puzzle))
+        self.assertTrue(expected.populate_grid())
+        worker = GenerationWorker(puzzle, POPULATE)
+        worker.start()
+        self.wait(worker)
+        self.assertEqual(worker.error, None)
+        self.assertTrue(worker.apply())
+        self.assertEqual(puzzle.get_placements(), expected.get_placements())
+        self.assertEqual(puzzle.grid.get_grid_size(), expected.grid.get_grid_size())
+        self.assertEqual(puzzle.grid.cells, expected.grid.cells)
+
+    def test_cancel(self):
+        puzzle = self.make_puzzle(["word%d" % number for number in range(0, 3000)])
+        placements = puzzle.get_placements()
+        worker = GenerationWorker(puzzle, POPULATE)
+        worker.start()
+        worker.cancel()
+        self.assertFalse(worker.process.is_alive())
+        self.assertFalse(worker.apply())
+        self.assertEqual(puzzle.get_placements(), placements)
+
+
+if __name__ == "__main__":
+    unittest.main()